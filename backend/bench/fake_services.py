@@ -0,0 +1,146 @@
+"""Local stand-ins for the OpenAI and Adzuna APIs used by the benchmark.
+
+Run with: uvicorn bench.fake_services:app --port 8900
+
+Behaviour is controlled by environment variables:
+  FAKE_LATENCY_MS      mean response latency (default 300)
+  FAKE_JITTER_MS       uniform +/- jitter around the mean (default 100)
+  FAKE_ERROR_RATE      fraction of requests answered with a 500 (default 0)
+  FAKE_STREAM_CHUNKS   number of chunks in a streamed completion (default 20)
+"""
+import asyncio
+import json
+import os
+import random
+import time
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+FAKE_LATENCY_MS = float(os.getenv("FAKE_LATENCY_MS", "300"))
+FAKE_JITTER_MS = float(os.getenv("FAKE_JITTER_MS", "100"))
+FAKE_ERROR_RATE = float(os.getenv("FAKE_ERROR_RATE", "0"))
+FAKE_STREAM_CHUNKS = int(os.getenv("FAKE_STREAM_CHUNKS", "20"))
+
+SKILLS = ["Python", "SQL", "Tableau", "Statistics", "Excel", "Machine Learning", "React", "Docker", "AWS", "R"]
+TITLES = ["Data Analyst", "Data Scientist", "Backend Engineer", "ML Engineer", "BI Developer", "Analytics Engineer"]
+COMPANIES = ["Acme", "Globex", "Initech", "Umbrella", "Hooli", "Stark Industries"]
+
+app = FastAPI()
+
+async def simulate_latency():
+    delay = max(0.0, FAKE_LATENCY_MS + random.uniform(-FAKE_JITTER_MS, FAKE_JITTER_MS))
+    await asyncio.sleep(delay / 1000)
+
+def should_fail():
+    return random.random() < FAKE_ERROR_RATE
+
+def fake_reply(prompt, json_mode):
+    """A plausible reply for each of the app's prompt shapes"""
+    if json_mode and '"skills"' in prompt:
+        return json.dumps({"skills": random.sample(SKILLS, 6)})
+    if json_mode and '"gpa"' in prompt:
+        return json.dumps({"gpa": 3.6, "relevant_courses": ["Databases", "Statistics"], "honors": ["Dean's List"]})
+    if json_mode and '"fit_score"' in prompt:
+        missing = random.sample(SKILLS, 2)
+        return json.dumps({
+            "fit_score": random.randint(40, 95),
+            "missing_skills": missing,
+            "matching_skills": random.sample(SKILLS, 3),
+            "recommendation": f"Strong overlap; consider learning {missing[0]}."
+        })
+    if json_mode:
+        return json.dumps({})
+    if "Rate how well" in prompt:
+        return str(random.randint(30, 95))
+    words = "Thanks for reaching out. Focus on measurable results and tailor each application to the role.".split()
+    return " ".join(random.choice(words) for _ in range(120))
+
+def completion_body(model, content, prompt_tokens):
+    completion_tokens = len(content.split())
+    return {
+        "id": f"chatcmpl-fake-{random.getrandbits(32):x}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+    }
+
+def error_response():
+    return JSONResponse(status_code=500, content={"error": {"message": "Injected failure", "type": "server_error"}})
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    messages = body.get("messages", [])
+    prompt = "\n".join(m.get("content", "") for m in messages)
+    prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4
+    json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+    content = fake_reply(prompt, json_mode)
+    model = body.get("model", "gpt-4o-mini")
+
+    await simulate_latency()
+    if should_fail():
+        return error_response()
+
+    if not body.get("stream"):
+        return completion_body(model, content, prompt_tokens)
+
+    async def chunks():
+        words = content.split(" ")
+        size = max(1, len(words) // FAKE_STREAM_CHUNKS)
+        for i in range(0, len(words), size):
+            piece = " ".join(words[i:i + size]) + " "
+            chunk = {
+                "id": "chatcmpl-fake-stream",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(FAKE_LATENCY_MS / 1000 / FAKE_STREAM_CHUNKS)
+        if (body.get("stream_options") or {}).get("include_usage"):
+            usage = completion_body(model, content, prompt_tokens)["usage"]
+            chunk = {
+                "id": "chatcmpl-fake-stream",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [],
+                "usage": usage
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(chunks(), media_type="text/event-stream")
+
+@app.get("/adzuna/{location}/search/{page}")
+async def adzuna_search(location: str, page: int, what: str = "", results_per_page: int = 10):
+    await simulate_latency()
+    if should_fail():
+        return error_response()
+
+    rng = random.Random(f"{what}:{location}:{page}")
+    results = []
+    for i in range(results_per_page):
+        skills = ", ".join(rng.sample(SKILLS, 4))
+        results.append({
+            "id": f"{page}-{i}-{rng.getrandbits(24):x}",
+            "title": rng.choice(TITLES),
+            "company": {"display_name": rng.choice(COMPANIES)},
+            "location": {"display_name": "Remote"},
+            "description": f"We are hiring for {what}. You will work with {skills} on data products and dashboards.",
+            "salary_min": 70000,
+            "salary_max": 120000,
+            "redirect_url": "https://example.com/job"
+        })
+    return {"results": results}
@@ -0,0 +1,274 @@
+"""End-to-end load benchmark for the API.
+
+Starts the fake OpenAI/Adzuna server and the real app in subprocesses, drives a
+weighted mix of upload/compare/search/chat/history requests at each
+concurrency level, and reports p50/p95/p99 latency and throughput per endpoint.
+
+Run from backend/:
+    python -m bench.run_bench --concurrency 1,8,32 --requests 200
+    python -m bench.run_bench --baseline bench/baseline.json        # fail on p95 regressions
+    python -m bench.run_bench --save-baseline bench/baseline.json   # record a new baseline
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+from bench.fixtures import make_fixture_set
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MIX = {"upload": 10, "compare": 30, "search": 20, "chat": 25, "history": 15}
+
+JOB_DESCRIPTIONS = [
+    f"{title} needed. Requirements: {skills}. You will partner with product teams on analytics and reporting."
+    for title in ["Data Analyst", "Data Scientist", "BI Developer", "ML Engineer", "Analytics Engineer"]
+    for skills in ["Python, SQL, Tableau", "SQL, Excel, Statistics", "Python, Docker, AWS", "R, Statistics, ML"]
+]
+
+CHAT_MESSAGES = [
+    "How should I prepare for a data analyst interview?",
+    "Which skills should I learn next?",
+    "Can you review how I describe my last project?",
+    "How do I negotiate salary for my first offer?",
+]
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(app, port, env, cwd):
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--app-dir", BACKEND_DIR,
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, **env},
+        cwd=cwd,
+        stdout=subprocess.DEVNULL
+    )
+
+async def wait_ready(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+class Driver:
+    def __init__(self, client, fixtures, rng):
+        self.client = client
+        self.fixtures = [pdf for pdfs in fixtures.values() for pdf in pdfs]
+        self.rng = rng
+        self.resume_ids = []
+
+    async def upload(self):
+        pdf = self.rng.choice(self.fixtures)
+        response = await self.client.post("/api/resume/upload", files={"file": ("resume.pdf", pdf, "application/pdf")})
+        if response.status_code == 200:
+            self.resume_ids.append(response.json()["resume_id"])
+        return response
+
+    async def compare(self):
+        return await self.client.post("/api/job/compare", json={
+            "resume_id": self.rng.choice(self.resume_ids),
+            "job_description": self.rng.choice(JOB_DESCRIPTIONS),
+            "job_title": "Data Analyst",
+            "company": "Acme"
+        })
+
+    async def search(self):
+        return await self.client.post("/api/jobs/search", json={"resume_id": self.rng.choice(self.resume_ids)})
+
+    async def chat(self):
+        return await self.client.post("/api/chat", json={
+            "message": self.rng.choice(CHAT_MESSAGES),
+            "resume_id": self.rng.choice(self.resume_ids)
+        })
+
+    async def history(self):
+        return await self.client.get(f"/api/history/{self.rng.choice(self.resume_ids)}")
+
+async def run_level(driver, mix, concurrency, total):
+    """Run `total` requests drawn from `mix` with `concurrency` in flight"""
+    names = list(mix)
+    ops = driver.rng.choices(names, weights=[mix[n] for n in names], k=total)
+    queue = asyncio.Queue()
+    for op in ops:
+        queue.put_nowait(op)
+    samples = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+
+    async def worker():
+        while not queue.empty():
+            op = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                response = await getattr(driver, op)()
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            samples[op].append((time.perf_counter() - start) * 1000)
+            if not ok:
+                errors[op] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    report = {}
+    for name in names:
+        latencies = sorted(samples[name])
+        if not latencies:
+            continue
+        report[name] = {
+            "count": len(latencies),
+            "errors": errors[name],
+            "p50_ms": round(percentile(latencies, 50), 1),
+            "p95_ms": round(percentile(latencies, 95), 1),
+            "p99_ms": round(percentile(latencies, 99), 1),
+            "rps": round(len(latencies) / elapsed, 2)
+        }
+    report["_total"] = {"count": total, "seconds": round(elapsed, 2), "rps": round(total / elapsed, 2)}
+    return report
+
+def print_report(results):
+    for level, report in results.items():
+        total = report["_total"]
+        print(f"\nconcurrency={level}  {total['count']} requests in {total['seconds']}s  ({total['rps']} req/s)")
+        print(f"  {'endpoint':<10}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}")
+        for name, row in report.items():
+            if name == "_total":
+                continue
+            print(f"  {name:<10}{row['count']:>7}{row['errors']:>8}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}{row['rps']:>9}")
+
+def compare_to_baseline(results, baseline, tolerance, slack_ms):
+    """List of p95 regressions against a saved baseline"""
+    regressions = []
+    for level, report in results.items():
+        for name, row in report.items():
+            base = baseline.get("results", {}).get(level, {}).get(name)
+            if name == "_total" or not base:
+                continue
+            limit = base["p95_ms"] * (1 + tolerance) + slack_ms
+            if row["p95_ms"] > limit:
+                regressions.append(f"concurrency={level} {name}: p95 {row['p95_ms']}ms > {limit:.1f}ms (baseline {base['p95_ms']}ms)")
+    return regressions
+
+async def main(args):
+    config = {
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "error_rate": args.error_rate,
+        "pages": args.pages,
+        "seed": args.seed,
+    }
+    mix = dict(DEFAULT_MIX)
+    if args.mix:
+        mix = {name: float(weight) for name, weight in (part.split("=") for part in args.mix.split(","))}
+
+    print("📄 Generating PDF fixtures...")
+    fixtures = make_fixture_set(args.pages, per_size=args.fixtures_per_size)
+
+    workdir = tempfile.mkdtemp(prefix="career-copilot-bench-")
+    fake_port, app_port = free_port(), free_port()
+    fake_url = f"http://127.0.0.1:{fake_port}"
+    fake = start_server("bench.fake_services:app", fake_port, {
+        "FAKE_LATENCY_MS": str(args.latency_ms),
+        "FAKE_JITTER_MS": str(args.jitter_ms),
+        "FAKE_ERROR_RATE": str(args.error_rate),
+    }, workdir)
+    app = start_server("main:app", app_port, {
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"{fake_url}/v1",
+        "ADZUNA_APP_ID": "bench",
+        "ADZUNA_APP_KEY": "bench",
+        "ADZUNA_BASE_URL": f"{fake_url}/adzuna",
+        "SQLITE_DB_FILE": os.path.join(workdir, "bench.db"),
+    }, workdir)
+
+    try:
+        await wait_ready(f"{fake_url}/docs")
+        await wait_ready(f"http://127.0.0.1:{app_port}/")
+        print(f"🚀 App on :{app_port}, fakes on :{fake_port} (workdir {workdir})")
+
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{app_port}", timeout=120) as client:
+            driver = Driver(client, fixtures, random.Random(args.seed))
+            for _ in range(3):
+                await driver.upload()
+            if not driver.resume_ids:
+                raise RuntimeError("Setup uploads failed; is the app configured correctly?")
+
+            results = {}
+            for level in args.concurrency:
+                print(f"⏱️  concurrency={level}...")
+                results[str(level)] = await run_level(driver, mix, level, args.requests)
+    finally:
+        for process in (app, fake):
+            process.terminate()
+            process.wait()
+
+    print_report(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"config": config, "results": results}, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({"config": config, "results": results}, f, indent=2)
+        print(f"\n✅ Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get("config") != config:
+            print("\n⚠️  Baseline was recorded with a different configuration; comparison may not be meaningful")
+        regressions = compare_to_baseline(results, baseline, args.tolerance, args.slack_ms)
+        if regressions:
+            print("\n❌ Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\n✅ No p95 regressions against baseline")
+    return 0
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=lambda s: [int(x) for x in s.split(",")], default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    parser.add_argument("--mix", default="", help="endpoint weights, e.g. upload=10,compare=30,search=20,chat=25,history=15")
+    parser.add_argument("--latency-ms", type=float, default=300, help="fake upstream mean latency")
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of fake upstream calls that fail")
+    parser.add_argument("--pages", type=lambda s: [int(x) for x in s.split(",")], default=[1, 5, 20],
+                        help="page counts of the resume PDF fixtures")
+    parser.add_argument("--fixtures-per-size", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="compare p95 against this results file")
+    parser.add_argument("--save-baseline", help="write results as a new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p95 increase")
+    parser.add_argument("--slack-ms", type=float, default=20, help="allowed absolute p95 increase")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
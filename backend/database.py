@@ -1,8 +1,42 @@
+import atexit
 import json
 import os
-from datetime import datetime
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from services.metrics import span
+from services.ranking_service import normalize_skill
 
 DB_FILE = "career_copilot_db.json"
+SQLITE_FILE = os.getenv("SQLITE_DB_FILE", "career_copilot.db")
+
+# "sqlite" (default) or "json" for the legacy whole-file store
+DB_BACKEND = os.getenv("DB_BACKEND", "sqlite")
+
+# Read-through cache for resume/transcript profiles. Resumes never change once
+# stored; transcripts can be replaced by another worker, so they expire.
+PROFILE_CACHE_MAX_ENTRIES = int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "256"))
+PROFILE_CACHE_TTL_SECONDS = float(os.getenv("PROFILE_CACHE_TTL_SECONDS", "30"))
+
+# History and chat records are written in batches by a background thread:
+# once WRITE_BATCH_SIZE are waiting or WRITE_FLUSH_SECONDS after the first.
+# WRITE_BEHIND=0 writes each record inside the request instead.
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "1") == "1"
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "50"))
+WRITE_FLUSH_SECONDS = float(os.getenv("WRITE_FLUSH_SECONDS", "0.5"))
+
+def _score(value):
+    """Fit score as an int; the LLM occasionally returns it as a string"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+def _company_key(company):
+    return " ".join((company or "").lower().split())
 
 def load_db():
     """Load database from file"""
@@ -20,45 +54,880 @@ def save_db(db):
     with open(DB_FILE, 'w') as f:
         json.dump(db, f, indent=2)
 
-def add_analysis(resume_id, job_title, company, analysis_data):
-    """Save a job analysis to history"""
-    db = load_db()
-    
-    analysis_record = {
-        "id": len(db["analyses"]) + 1,
+class JsonStorage:
+    """Legacy store that rewrites the whole JSON file on every write"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def add_analysis(self, record):
+        with self._lock:
+            db = load_db()
+            record = {"id": max((a["id"] for a in db["analyses"]), default=0) + 1, **record}
+            db["analyses"].append(record)
+            save_db(db)
+        return record
+
+    def add_analyses(self, records):
+        with self._lock:
+            db = load_db()
+            next_id = max((a["id"] for a in db["analyses"]), default=0) + 1
+            records = [{"id": next_id + i, **record} for i, record in enumerate(records)]
+            db["analyses"].extend(records)
+            save_db(db)
+        return records
+
+    def get_analysis_history(self, resume_id):
+        return [a for a in load_db()["analyses"] if a["resume_id"] == resume_id]
+
+    # The JSON file is read whole on every call anyway, so aggregates are
+    # computed by scanning it; SqliteStorage maintains them incrementally.
+    def get_analysis_page(self, resume_id, limit, before_id=None, before_at=None):
+        analyses = [a for a in self.get_analysis_history(resume_id)
+                    if (before_id is None or a["id"] < before_id) and (before_at is None or a["timestamp"] < before_at)]
+        return sorted(analyses, key=lambda a: a["id"], reverse=True)[:limit]
+
+    def get_analysis_stats(self, resume_id):
+        analyses = self.get_analysis_history(resume_id)
+        if not analyses:
+            return None
+        scores = [_score(a["fit_score"]) for a in analyses]
+        timestamps = [a["timestamp"] for a in analyses]
+        return {"count": len(scores), "score_sum": sum(scores), "best_score": max(scores),
+                "first_at": min(timestamps), "last_at": max(timestamps)}
+
+    def get_fit_trend(self, resume_id, since_day):
+        buckets = {}
+        for a in self.get_analysis_history(resume_id):
+            if a["timestamp"][:10] < since_day:
+                continue
+            bucket = buckets.setdefault(a["timestamp"][:10], {"day": a["timestamp"][:10], "count": 0, "score_sum": 0})
+            bucket["count"] += 1
+            bucket["score_sum"] += _score(a["fit_score"])
+        return [buckets[day] for day in sorted(buckets, reverse=True)]
+
+    def get_top_missing_skills(self, resume_id, limit):
+        counts = {}
+        for a in self.get_analysis_history(resume_id):
+            for skill in a.get("missing_skills", []):
+                key = normalize_skill(skill)
+                if key:
+                    counts.setdefault(key, {"skill": skill, "count": 0})["count"] += 1
+        return sorted(counts.values(), key=lambda c: -c["count"])[:limit]
+
+    def get_company_stats(self, resume_id, limit):
+        companies = {}
+        for a in self.get_analysis_history(resume_id):
+            score = _score(a["fit_score"])
+            stats = companies.setdefault(_company_key(a["company"]), {
+                "company": a["company"], "count": 0, "score_sum": 0, "best_score": score, "last_at": a["timestamp"]
+            })
+            stats["count"] += 1
+            stats["score_sum"] += score
+            stats["best_score"] = max(stats["best_score"], score)
+            stats["last_at"] = max(stats["last_at"], a["timestamp"])
+        return sorted(companies.values(), key=lambda c: -c["count"])[:limit]
+
+    def add_chat_message(self, record):
+        with self._lock:
+            db = load_db()
+            record = {"id": max((c["id"] for c in db["chat_history"]), default=0) + 1, **record}
+            db["chat_history"].append(record)
+            save_db(db)
+        return record
+
+    def add_chat_messages(self, records):
+        with self._lock:
+            db = load_db()
+            next_id = max((c["id"] for c in db["chat_history"]), default=0) + 1
+            records = [{"id": next_id + i, **record} for i, record in enumerate(records)]
+            db["chat_history"].extend(records)
+            save_db(db)
+        return records
+
+    def get_chat_history(self, limit, session_id=None):
+        chats = load_db()["chat_history"]
+        if session_id is not None:
+            chats = [c for c in chats if c.get("session_id") == session_id]
+        return chats[-limit:]
+
+
+    def get_latest_chat_id(self, session_id):
+        ids = [c["id"] for c in load_db()["chat_history"] if c.get("session_id") == session_id]
+        return max(ids, default=None)
+
+    def get_chat_summary(self, session_id):
+        return load_db().get("chat_summaries", {}).get(session_id)
+
+    def save_chat_summary(self, session_id, summary):
+        with self._lock:
+            db = load_db()
+            db.setdefault("chat_summaries", {})[session_id] = summary
+            save_db(db)
+
+    def save_resume(self, resume_id, record):
+        with self._lock:
+            db = load_db()
+            db["resumes"][resume_id] = record
+            save_db(db)
+
+    def get_resume(self, resume_id):
+        return load_db()["resumes"].get(resume_id)
+
+    def find_resume(self, field, value):
+        matches = [(r.get("uploaded_at", ""), rid, r) for rid, r in load_db()["resumes"].items() if r.get(field) == value]
+        if not matches:
+            return None, None
+        _, resume_id, record = min(matches)
+        return resume_id, record
+
+    def save_transcript(self, resume_id, data):
+        with self._lock:
+            db = load_db()
+            db.setdefault("transcripts", {})[resume_id] = data
+            save_db(db)
+
+    def get_transcript(self, resume_id):
+        return load_db().get("transcripts", {}).get(resume_id)
+
+class SqliteStorage:
+    """Indexed SQLite store in WAL mode: O(1) appends, indexed lookups, atomic ids"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS analyses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        resume_id TEXT NOT NULL,
+        job_title TEXT,
+        company TEXT,
+        fit_score INTEGER,
+        missing_skills TEXT NOT NULL DEFAULT '[]',
+        timestamp TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_analyses_resume_ts ON analyses (resume_id, timestamp);
+    CREATE INDEX IF NOT EXISTS idx_analyses_resume_id ON analyses (resume_id, id);
+    CREATE TABLE IF NOT EXISTS analysis_stats (
+        resume_id TEXT PRIMARY KEY,
+        count INTEGER NOT NULL,
+        score_sum INTEGER NOT NULL,
+        best_score INTEGER NOT NULL,
+        first_at TEXT NOT NULL,
+        last_at TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS analysis_daily (
+        resume_id TEXT NOT NULL,
+        day TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        score_sum INTEGER NOT NULL,
+        PRIMARY KEY (resume_id, day)
+    );
+    CREATE TABLE IF NOT EXISTS missing_skill_counts (
+        resume_id TEXT NOT NULL,
+        skill_key TEXT NOT NULL,
+        skill TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (resume_id, skill_key)
+    );
+    CREATE INDEX IF NOT EXISTS idx_missing_skill_rank ON missing_skill_counts (resume_id, count);
+    CREATE TABLE IF NOT EXISTS company_stats (
+        resume_id TEXT NOT NULL,
+        company_key TEXT NOT NULL,
+        company TEXT,
+        count INTEGER NOT NULL,
+        score_sum INTEGER NOT NULL,
+        best_score INTEGER NOT NULL,
+        last_at TEXT NOT NULL,
+        PRIMARY KEY (resume_id, company_key)
+    );
+    CREATE INDEX IF NOT EXISTS idx_company_rank ON company_stats (resume_id, count);
+    CREATE TABLE IF NOT EXISTS chat_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_message TEXT NOT NULL,
+        ai_response TEXT NOT NULL,
+        timestamp TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_chat_ts ON chat_history (timestamp);
+    CREATE TABLE IF NOT EXISTS chat_summaries (
+        session_id TEXT PRIMARY KEY,
+        summary TEXT NOT NULL,
+        through_id INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS resumes (
+        id TEXT PRIMARY KEY,
+        pdf_sha256 TEXT,
+        text_sha256 TEXT,
+        uploaded_at TEXT,
+        data TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_resumes_pdf ON resumes (pdf_sha256);
+    CREATE INDEX IF NOT EXISTS idx_resumes_text ON resumes (text_sha256);
+    CREATE TABLE IF NOT EXISTS transcripts (
+        resume_id TEXT PRIMARY KEY,
+        updated_at TEXT,
+        data TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(self.SCHEMA)
+            # Databases created before per-session chat lack the column
+            columns = [row["name"] for row in conn.execute("PRAGMA table_info(chat_history)")]
+            if "session_id" not in columns:
+                conn.execute("ALTER TABLE chat_history ADD COLUMN session_id TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_session ON chat_history (session_id, id)")
+            # Databases created before the aggregate tables need them filled once
+            if not conn.execute("SELECT 1 FROM meta WHERE key = 'analysis_aggregates'").fetchone():
+                for row in conn.execute("SELECT * FROM analyses ORDER BY id").fetchall():
+                    self._aggregate(conn, self._analysis_row(row))
+                conn.execute(
+                    "INSERT INTO meta (key, value) VALUES ('analysis_aggregates', ?)",
+                    (datetime.now().isoformat(),)
+                )
+
+    def _conn(self):
+        """One connection per thread; sqlite3 connections are not thread-safe"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _analysis_row(row):
+        record = dict(row)
+        record["missing_skills"] = json.loads(record["missing_skills"])
+        return record
+
+    @staticmethod
+    def _aggregate(conn, record):
+        """Fold one analysis into the per-resume aggregates, in the caller's transaction"""
+        resume_id, score, timestamp = record["resume_id"], _score(record["fit_score"]), record["timestamp"]
+        conn.execute(
+            "INSERT INTO analysis_stats (resume_id, count, score_sum, best_score, first_at, last_at) "
+            "VALUES (?, 1, ?, ?, ?, ?) ON CONFLICT (resume_id) DO UPDATE SET "
+            "count = count + 1, score_sum = score_sum + excluded.score_sum, "
+            "best_score = MAX(best_score, excluded.best_score), "
+            "first_at = MIN(first_at, excluded.first_at), last_at = MAX(last_at, excluded.last_at)",
+            (resume_id, score, score, timestamp, timestamp)
+        )
+        conn.execute(
+            "INSERT INTO analysis_daily (resume_id, day, count, score_sum) VALUES (?, ?, 1, ?) "
+            "ON CONFLICT (resume_id, day) DO UPDATE SET count = count + 1, score_sum = score_sum + excluded.score_sum",
+            (resume_id, timestamp[:10], score)
+        )
+        skills = {}
+        for skill in record["missing_skills"]:
+            key = normalize_skill(skill)
+            if key:
+                skills.setdefault(key, skill)
+        conn.executemany(
+            "INSERT INTO missing_skill_counts (resume_id, skill_key, skill, count) VALUES (?, ?, ?, 1) "
+            "ON CONFLICT (resume_id, skill_key) DO UPDATE SET count = count + 1",
+            [(resume_id, key, skill) for key, skill in skills.items()]
+        )
+        conn.execute(
+            "INSERT INTO company_stats (resume_id, company_key, company, count, score_sum, best_score, last_at) "
+            "VALUES (?, ?, ?, 1, ?, ?, ?) ON CONFLICT (resume_id, company_key) DO UPDATE SET "
+            "count = count + 1, score_sum = score_sum + excluded.score_sum, "
+            "best_score = MAX(best_score, excluded.best_score), last_at = MAX(last_at, excluded.last_at)",
+            (resume_id, _company_key(record["company"]), record["company"], score, score, timestamp)
+        )
+
+    def _insert_analyses(self, conn, records):
+        stored = []
+        for record in records:
+            cursor = conn.execute(
+                "INSERT INTO analyses (resume_id, job_title, company, fit_score, missing_skills, timestamp) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (record["resume_id"], record["job_title"], record["company"], record["fit_score"],
+                 json.dumps(record["missing_skills"]), record["timestamp"])
+            )
+            self._aggregate(conn, record)
+            stored.append({"id": cursor.lastrowid, **record})
+        return stored
+
+    def add_analysis(self, record):
+        with self._conn() as conn:
+            return self._insert_analyses(conn, [record])[0]
+
+    def add_analyses(self, records):
+        """Insert many analyses in one transaction"""
+        with self._conn() as conn:
+            return self._insert_analyses(conn, records)
+
+    def get_analysis_history(self, resume_id):
+        rows = self._conn().execute(
+            "SELECT * FROM analyses WHERE resume_id = ? ORDER BY timestamp, id", (resume_id,)
+        ).fetchall()
+        return [self._analysis_row(row) for row in rows]
+
+    def get_analysis_page(self, resume_id, limit, before_id=None, before_at=None):
+        if before_at is not None:
+            rows = self._conn().execute(
+                "SELECT * FROM analyses WHERE resume_id = ? AND timestamp < ? ORDER BY id DESC LIMIT ?",
+                (resume_id, before_at, limit)
+            ).fetchall()
+        else:
+            rows = self._conn().execute(
+                "SELECT * FROM analyses WHERE resume_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                (resume_id, before_id if before_id is not None else 2 ** 63 - 1, limit)
+            ).fetchall()
+        return [self._analysis_row(row) for row in rows]
+
+    def get_analysis_stats(self, resume_id):
+        row = self._conn().execute("SELECT * FROM analysis_stats WHERE resume_id = ?", (resume_id,)).fetchone()
+        return dict(row) if row else None
+
+    def get_fit_trend(self, resume_id, since_day):
+        rows = self._conn().execute(
+            "SELECT day, count, score_sum FROM analysis_daily WHERE resume_id = ? AND day >= ? ORDER BY day DESC",
+            (resume_id, since_day)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_top_missing_skills(self, resume_id, limit):
+        rows = self._conn().execute(
+            "SELECT skill, count FROM missing_skill_counts WHERE resume_id = ? ORDER BY count DESC LIMIT ?",
+            (resume_id, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_company_stats(self, resume_id, limit):
+        rows = self._conn().execute(
+            "SELECT company, count, score_sum, best_score, last_at FROM company_stats "
+            "WHERE resume_id = ? ORDER BY count DESC LIMIT ?",
+            (resume_id, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def add_chat_message(self, record):
+        return self.add_chat_messages([record])[0]
+
+    def add_chat_messages(self, records):
+        """Insert many chat messages in one transaction"""
+        stored = []
+        with self._conn() as conn:
+            for record in records:
+                cursor = conn.execute(
+                    "INSERT INTO chat_history (user_message, ai_response, timestamp, session_id) VALUES (?, ?, ?, ?)",
+                    (record["user_message"], record["ai_response"], record["timestamp"], record.get("session_id"))
+                )
+                stored.append({"id": cursor.lastrowid, **record})
+        return stored
+
+    def get_chat_history(self, limit, session_id=None):
+        if session_id is None:
+            rows = self._conn().execute(
+                "SELECT * FROM chat_history ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        else:
+            rows = self._conn().execute(
+                "SELECT * FROM chat_history WHERE session_id = ? ORDER BY id DESC LIMIT ?", (session_id, limit)
+            ).fetchall()
+        return [dict(row) for row in reversed(rows)]
+
+
+    def get_latest_chat_id(self, session_id):
+        row = self._conn().execute(
+            "SELECT MAX(id) AS id FROM chat_history WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row["id"]
+
+    def get_chat_summary(self, session_id):
+        row = self._conn().execute(
+            "SELECT summary, through_id FROM chat_summaries WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def save_chat_summary(self, session_id, summary):
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO chat_summaries (session_id, summary, through_id) VALUES (?, ?, ?)",
+                (session_id, summary["summary"], summary["through_id"])
+            )
+
+    def save_resume(self, resume_id, record):
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO resumes (id, pdf_sha256, text_sha256, uploaded_at, data) VALUES (?, ?, ?, ?, ?)",
+                (resume_id, record.get("pdf_sha256"), record.get("text_sha256"),
+                 record.get("uploaded_at"), json.dumps(record))
+            )
+
+    def get_resume(self, resume_id):
+        row = self._conn().execute("SELECT data FROM resumes WHERE id = ?", (resume_id,)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def find_resume(self, field, value):
+        if field not in ("pdf_sha256", "text_sha256"):
+            raise ValueError(f"Resumes are not indexed by {field}")
+        row = self._conn().execute(
+            f"SELECT id, data FROM resumes WHERE {field} = ? ORDER BY uploaded_at LIMIT 1", (value,)
+        ).fetchone()
+        return (row["id"], json.loads(row["data"])) if row else (None, None)
+
+    def save_transcript(self, resume_id, data):
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO transcripts (resume_id, updated_at, data) VALUES (?, ?, ?)",
+                (resume_id, datetime.now().isoformat(), json.dumps(data))
+            )
+
+    def get_transcript(self, resume_id):
+        row = self._conn().execute("SELECT data FROM transcripts WHERE resume_id = ?", (resume_id,)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def migrate_from_json(self, json_file):
+        """Copy analyses and chat history from the legacy JSON file, once.
+
+        Records are re-numbered in file order, since the old ids may collide.
+        Returns the number of records imported (0 if already migrated).
+        """
+        if not os.path.exists(json_file):
+            return 0
+
+        conn = self._conn()
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_from_json'").fetchone():
+            return 0
+
+        with open(json_file, 'r') as f:
+            legacy = json.load(f)
+
+        analyses = legacy.get("analyses", [])
+        chats = legacy.get("chat_history", [])
+        with conn:
+            self._insert_analyses(conn, [{
+                "resume_id": a.get("resume_id"),
+                "job_title": a.get("job_title"),
+                "company": a.get("company"),
+                "fit_score": a.get("fit_score", 0),
+                "missing_skills": a.get("missing_skills", []),
+                "timestamp": a.get("timestamp", "")
+            } for a in analyses])
+            conn.executemany(
+                "INSERT INTO chat_history (user_message, ai_response, timestamp) VALUES (?, ?, ?)",
+                [(c.get("user_message", ""), c.get("ai_response", ""), c.get("timestamp", "")) for c in chats]
+            )
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('migrated_from_json', ?)",
+                (datetime.now().isoformat(),)
+            )
+        return len(analyses) + len(chats)
+
+def _create_storage():
+    """Build the configured storage backend"""
+    if DB_BACKEND == "json":
+        return JsonStorage()
+
+    storage = SqliteStorage(SQLITE_FILE)
+    imported = storage.migrate_from_json(DB_FILE)
+    if imported:
+        print(f"✅ Migrated {imported} records from {DB_FILE} to {SQLITE_FILE}")
+    return storage
+
+storage = _create_storage()
+
+class WriteBehind:
+    """Queues analysis and chat records and writes them in batches off the request path.
+
+    Records get their "id" filled in when their batch is written. Reads never
+    wait for a write: they merge the records still queued (see pending()) with
+    what storage returns, so they see every record added before them.
+    """
+
+    def __init__(self, storage, batch_size, interval):
+        self.storage = storage
+        self.batch_size = max(1, batch_size)
+        self.interval = interval
+        self._pending = []  # (kind, record) in arrival order
+        self._writing = []  # the batch being written, visible to reads until it has ids
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+    def add(self, kind, record):
+        """Queue a record ("analysis" or "chat"); written at once after close()"""
+        with self._cond:
+            if not self._closed:
+                self._pending.append((kind, record))
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                    self._thread.start()
+                # Wake the writer to start its interval, or early for a full batch
+                if len(self._pending) in (1, self.batch_size):
+                    self._cond.notify()
+                return record
+        self._write([(kind, record)])
+        return record
+
+    def pending(self, kind, field, value):
+        """Queued `kind` records whose `field` equals value (any, for None), oldest first"""
+        with self._cond:
+            queued = self._writing + self._pending
+        return [record for k, record in queued
+                if k == kind and "id" not in record and (value is None or record.get(field) == value)]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                self._cond.wait_for(lambda: len(self._pending) >= self.batch_size or self._closed, self.interval)
+            if not self.flush():
+                time.sleep(self.interval)  # storage is failing; don't spin
+
+    def _write(self, batch):
+        analyses = [record for kind, record in batch if kind == "analysis"]
+        chats = [record for kind, record in batch if kind == "chat"]
+        with span("db", "flush_writes"):
+            for records, write in ((analyses, self.storage.add_analyses), (chats, self.storage.add_chat_messages)):
+                if records:
+                    for record, stored in zip(records, write(records)):
+                        record["id"] = stored["id"]
+
+    def flush(self):
+        """Write everything queued so far; returns False if the write failed"""
+        with self._flush_lock:
+            with self._cond:
+                batch, self._pending = self._pending, []
+                self._writing = batch
+            if not batch:
+                return True
+            try:
+                self._write(batch)
+                with self._cond:
+                    self._writing = []
+                return True
+            except Exception as e:
+                # Keep the records for the next attempt, ahead of anything newer
+                with self._cond:
+                    self._writing = []
+                    self._pending[:0] = [(kind, record) for kind, record in batch if "id" not in record]
+                print(f"❌ Failed to write {len(batch)} queued records: {e}")
+                return False
+
+    def close(self, timeout=10):
+        """Stop the background thread and write whatever is still queued"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+writer = WriteBehind(storage, WRITE_BATCH_SIZE, WRITE_FLUSH_SECONDS)
+atexit.register(writer.close)
+
+def _queued_analyses(resume_id):
+    return writer.pending("analysis", "resume_id", resume_id)
+
+def _excluding(records, others, key):
+    """`records` minus any also in `others`; a batch landing mid-read can put one record in both"""
+    seen = {key(record) for record in others}
+    return [record for record in records if key(record) not in seen]
+
+def _analysis_key(record):
+    return (record["resume_id"], record["timestamp"], record["job_title"], record["company"])
+
+def _chat_key(record):
+    return (record.get("session_id"), record["timestamp"], record["user_message"])
+
+def flush_writes():
+    """Write queued history and chat records and stop the writer (call on shutdown)"""
+    writer.close()
+
+_clock_lock = threading.Lock()
+_last_timestamp = ""
+
+def _timestamp():
+    """Now as ISO text, strictly increasing within this process.
+
+    Queued analyses have no id yet, so history pages through them by time;
+    two records sharing a microsecond would make that ambiguous.
+    """
+    global _last_timestamp
+    with _clock_lock:
+        now = datetime.now()
+        if now.isoformat() <= _last_timestamp:
+            now = datetime.fromisoformat(_last_timestamp) + timedelta(microseconds=1)
+        _last_timestamp = now.isoformat()
+        return _last_timestamp
+
+def _analysis_record(resume_id, job_title, company, analysis_data):
+    return {
         "resume_id": resume_id,
         "job_title": job_title,
         "company": company,
         "fit_score": analysis_data.get("fit_score", 0),
         "missing_skills": analysis_data.get("missing_skills", []),
-        "timestamp": datetime.now().isoformat()
+        "timestamp": _timestamp()
     }
-    
-    db["analyses"].append(analysis_record)
-    save_db(db)
-    return analysis_record
+
+def add_analysis(resume_id, job_title, company, analysis_data):
+    """Save a job analysis to history (queued unless WRITE_BEHIND=0)"""
+    record = _analysis_record(resume_id, job_title, company, analysis_data)
+    if WRITE_BEHIND:
+        return writer.add("analysis", record)
+    with span("db", "add_analysis"):
+        return storage.add_analysis(record)
+
+def add_analyses(resume_id, analyses):
+    """Save many (job_title, company, analysis_data) results in one write"""
+    records = [_analysis_record(resume_id, *analysis) for analysis in analyses]
+    if not records:
+        return []
+    if WRITE_BEHIND:
+        return [writer.add("analysis", record) for record in records]
+    with span("db", "add_analyses"):
+        return storage.add_analyses(records)
 
 def get_analysis_history(resume_id):
     """Get all analyses for a resume"""
-    db = load_db()
-    return [a for a in db["analyses"] if a["resume_id"] == resume_id]
-
-def add_chat_message(user_message, ai_response):
-    """Save chat message"""
-    db = load_db()
-    
-    chat_record = {
-        "id": len(db["chat_history"]) + 1,
+    queued = _queued_analyses(resume_id)
+    with span("db", "get_analysis_history"):
+        records = storage.get_analysis_history(resume_id)
+    return records + _excluding(queued, records, _analysis_key)
+
+def get_analysis_page(resume_id, limit, cursor=None):
+    """One page of at most `limit` of a resume's analyses, newest first.
+
+    Returns (records, next_cursor); pass next_cursor back for the following
+    page. It is None once there are no older records. Queued records are the
+    newest and have no id yet, so a page ending on one gets an "at:<timestamp>"
+    cursor instead of a stored id; both are opaque to callers.
+    """
+    queued = _queued_analyses(resume_id)[::-1]
+    before_id = before_at = None
+    if cursor is not None and cursor.startswith("at:"):
+        before_at = cursor[3:]
+        queued = [record for record in queued if record["timestamp"] < before_at]
+    elif cursor is not None:
+        before_id = int(cursor)
+        queued = []  # an id cursor is only handed out once the queue is paged through
+    page = queued[:limit]
+    want = limit - len(page)
+    # A batch landing mid-read can return records already on this page; fetch
+    # enough extra to drop them and still tell whether older rows remain
+    with span("db", "get_analysis_page"):
+        records = storage.get_analysis_page(resume_id, want + 1 + len(page), before_id, before_at)
+    records = _excluding(records, page, _analysis_key)
+    if len(queued) > len(page):
+        return page, f"at:{page[-1]['timestamp']}"
+    if len(records) > want:
+        if want == 0:
+            return page, f"at:{page[-1]['timestamp']}"
+        return page + records[:want], str(records[want - 1]["id"])
+    return page + records, None
+
+def _average(stats):
+    return round(stats["score_sum"] / stats["count"], 1) if stats["count"] else None
+
+def _fold(row, record):
+    """Add one queued analysis to a count/score_sum/best_score/last_at aggregate"""
+    score = _score(record["fit_score"])
+    row["count"] += 1
+    row["score_sum"] += score
+    row["best_score"] = max(row["best_score"], score)
+    row["last_at"] = max(row["last_at"], record["timestamp"])
+
+# Aggregates come from storage and the queued analyses are folded in here.
+# A batch landing between the two reads can be counted twice for that one
+# response; the window is the instant between its commit and its ids.
+
+def get_analysis_stats(resume_id):
+    """Count, average/best fit score and first/last analysis time for a resume"""
+    queued = _queued_analyses(resume_id)
+    with span("db", "get_analysis_stats"):
+        stats = storage.get_analysis_stats(resume_id)
+    for record in queued:
+        if not stats:
+            stats = {"count": 0, "score_sum": 0, "best_score": _score(record["fit_score"]),
+                     "first_at": record["timestamp"], "last_at": record["timestamp"]}
+        stats = dict(stats)
+        _fold(stats, record)
+        stats["first_at"] = min(stats["first_at"], record["timestamp"])
+    if not stats:
+        return {"count": 0, "average_fit": None, "best_fit": None, "first_at": None, "last_at": None}
+    return {
+        "count": stats["count"],
+        "average_fit": _average(stats),
+        "best_fit": stats["best_score"],
+        "first_at": stats["first_at"],
+        "last_at": stats["last_at"]
+    }
+
+def get_fit_trend(resume_id, days=30):
+    """Average fit score per day over the last `days` calendar days (today included), oldest first.
+
+    Days without analyses are left out.
+    """
+    since_day = (datetime.now() - timedelta(days=days - 1)).date().isoformat()
+    queued = _queued_analyses(resume_id)
+    with span("db", "get_fit_trend"):
+        buckets = {b["day"]: dict(b) for b in storage.get_fit_trend(resume_id, since_day)}
+    for record in queued:
+        day = record["timestamp"][:10]
+        if day < since_day:
+            continue
+        bucket = buckets.setdefault(day, {"day": day, "count": 0, "score_sum": 0})
+        bucket["count"] += 1
+        bucket["score_sum"] += _score(record["fit_score"])
+    return [{"day": day, "count": buckets[day]["count"], "average_fit": _average(buckets[day])} for day in sorted(buckets)]
+
+def get_top_missing_skills(resume_id, limit=10):
+    """Skills most often missing across a resume's analyses"""
+    queued = {}
+    for record in _queued_analyses(resume_id):
+        for skill in record.get("missing_skills", []):
+            key = normalize_skill(skill)
+            if key:
+                queued.setdefault(key, {"skill": skill, "count": 0})["count"] += 1
+    # Asking for one extra row per queued skill keeps the merged top `limit` exact
+    with span("db", "get_top_missing_skills"):
+        rows = storage.get_top_missing_skills(resume_id, limit + len(queued))
+    if not queued:
+        return rows[:limit]
+    counts = {normalize_skill(row["skill"]): dict(row) for row in rows}
+    for key, extra in queued.items():
+        counts.setdefault(key, {"skill": extra["skill"], "count": 0})["count"] += extra["count"]
+    return sorted(counts.values(), key=lambda c: -c["count"])[:limit]
+
+def get_company_stats(resume_id, limit=20):
+    """Per-company analysis count and fit scores, most analyzed first"""
+    queued = _queued_analyses(resume_id)
+    companies = {_company_key(record["company"]) for record in queued}
+    with span("db", "get_company_stats"):
+        rows = storage.get_company_stats(resume_id, limit + len(companies))
+    if queued:
+        merged = {_company_key(row["company"]): dict(row) for row in rows}
+        for record in queued:
+            row = merged.setdefault(_company_key(record["company"]), {
+                "company": record["company"], "count": 0, "score_sum": 0,
+                "best_score": _score(record["fit_score"]), "last_at": record["timestamp"]
+            })
+            _fold(row, record)
+        rows = sorted(merged.values(), key=lambda r: -r["count"])
+    rows = rows[:limit]
+    return [{
+        "company": row["company"],
+        "count": row["count"],
+        "average_fit": _average(row),
+        "best_fit": row["best_score"],
+        "last_at": row["last_at"]
+    } for row in rows]
+
+def add_chat_message(user_message, ai_response, session_id=None):
+    """Save chat message (queued unless WRITE_BEHIND=0; "id" is set once written)"""
+    record = {
         "user_message": user_message,
         "ai_response": ai_response,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": datetime.now().isoformat(),
+        "session_id": session_id
     }
-    
-    db["chat_history"].append(chat_record)
-    save_db(db)
-    return chat_record
-
-def get_chat_history(limit=10):
-    """Get recent chat history"""
-    db = load_db()
-    return db["chat_history"][-limit:]
\ No newline at end of file
+    if WRITE_BEHIND:
+        return writer.add("chat", record)
+    with span("db", "add_chat_message"):
+        return storage.add_chat_message(record)
+
+def get_chat_history(limit=10, session_id=None):
+    """Get recent chat history, optionally for one session"""
+    queued = writer.pending("chat", "session_id", session_id)
+    with span("db", "get_chat_history"):
+        records = storage.get_chat_history(limit, session_id)
+    return (records + _excluding(queued, records, _chat_key))[-limit:]
+
+def get_latest_chat_id(session_id):
+    """Id of a session's newest written chat message, or None (queued ones have no id yet)"""
+    with span("db", "get_latest_chat_id"):
+        return storage.get_latest_chat_id(session_id)
+
+def get_chat_summary(session_id):
+    """A session's rolled-up summary {"summary", "through_id"}, or None"""
+    with span("db", "get_chat_summary"):
+        return storage.get_chat_summary(session_id)
+
+def save_chat_summary(session_id, summary, through_id):
+    """Store a session's summary of every message up to through_id"""
+    with span("db", "save_chat_summary"):
+        storage.save_chat_summary(session_id, {"summary": summary, "through_id": through_id})
+
+_profile_cache = OrderedDict()  # (kind, resume_id) -> (expires_at, value)
+
+def _cache_get(key):
+    entry = _profile_cache.get(key)
+    if entry is None or entry[0] <= time.time():
+        return None
+    _profile_cache.move_to_end(key)
+    return entry[1]
+
+def _cache_put(key, value, ttl):
+    _profile_cache[key] = (time.time() + ttl, value)
+    _profile_cache.move_to_end(key)
+    while len(_profile_cache) > PROFILE_CACHE_MAX_ENTRIES:
+        _profile_cache.popitem(last=False)
+
+def new_resume_id():
+    """Collision-free resume id, safe across workers and restarts"""
+    return f"resume_{uuid.uuid4().hex}"
+
+def resume_ready(record):
+    """True once a resume has been fully ingested (records without a status predate async uploads)"""
+    return record.get("status", "ready") == "ready"
+
+def save_resume(resume_id, record):
+    """Store a parsed resume profile, or the placeholder of one still being ingested"""
+    with span("db", "save_resume"):
+        storage.save_resume(resume_id, record)
+    if resume_ready(record):
+        _cache_put(("resume", resume_id), record, float("inf"))
+
+def get_resume(resume_id):
+    """Get a resume profile, or None if no worker has stored it.
+
+    Placeholders of resumes still being ingested are returned but never cached.
+    """
+    record = _cache_get(("resume", resume_id))
+    if record is None:
+        with span("db", "get_resume"):
+            record = storage.get_resume(resume_id)
+        if record is not None and resume_ready(record):
+            _cache_put(("resume", resume_id), record, float("inf"))
+    return record
+
+def find_resume_by_hash(field, value):
+    """Earliest (resume_id, record) whose pdf_sha256/text_sha256 equals value, or (None, None)"""
+    with span("db", "find_resume"):
+        return storage.find_resume(field, value)
+
+def save_transcript(resume_id, data):
+    """Store parsed transcript data for a resume"""
+    with span("db", "save_transcript"):
+        storage.save_transcript(resume_id, data)
+    _cache_put(("transcript", resume_id), data, PROFILE_CACHE_TTL_SECONDS)
+
+def get_transcript(resume_id):
+    """Get transcript data for a resume, or None"""
+    data = _cache_get(("transcript", resume_id))
+    if data is None:
+        with span("db", "get_transcript"):
+            data = storage.get_transcript(resume_id)
+        if data is not None:
+            _cache_put(("transcript", resume_id), data, PROFILE_CACHE_TTL_SECONDS)
+    return data
+
+if __name__ == "__main__":
+    # One-shot migration: python database.py
+    count = SqliteStorage(SQLITE_FILE).migrate_from_json(DB_FILE)
+    print(f"Imported {count} records from {DB_FILE} into {SQLITE_FILE}")
@@ -1,41 +1,51 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+# Imported first so STARTUP_REPORT=1 can time everything below
+from services import startup_report
+startup_report.begin()
+
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse, Response, JSONResponse
 from pydantic import BaseModel
-import fitz  # PyMuPDF
-from openai import OpenAI
 import os
 from dotenv import load_dotenv
 import json
+import re
+import math
+import hashlib
+import asyncio
+import time
 from typing import Optional, List
 from datetime import datetime
 
+# Load environment variables before the services read their settings
+load_dotenv()
+
 # Import our services
-from services.adzuna_service import search_jobs
+from services.adzuna_service import search_jobs, close_client as close_adzuna_client
 from services.learning_path_service import generate_learning_path
-from database import add_analysis, get_analysis_history, add_chat_message, get_chat_history
-
-# Load environment variables
-load_dotenv()
+from services.llm_service import chat_completion, stream_chat_completion, map_bounded, get_async_client
+from services.llm_cache import llm_cache
+from services.llm_scheduler import scheduler as llm_scheduler, LLMOverloaded, endpoint_budget
+from services.ranking_service import rank_jobs, normalize_skill
+from services.pdf_service import (
+    extract_pdf_text, spool_upload, remove_spool, shutdown_pool, warm_pool, PdfTooLargeError, PdfUnreadableError, PDF_MAX_BYTES
+)
+from services import metrics
+from services import chat_memory
+from services import request_profiler
+from services.resume_digest import build_digest, digest_for, render_digest
+from services.job_digest import job_digest, render_job_digest, compare_locally
+from services.task_queue import TaskQueue, notify_change, wait_for_change
+from services.skill_extractor import SKILL_EXTRACTION_MODE, extract_resume_profile, extract_transcript
+from database import (
+    add_analysis, add_analyses, get_analysis_page, get_analysis_stats, get_fit_trend,
+    get_top_missing_skills, get_company_stats, add_chat_message, flush_writes,
+    new_resume_id, save_resume, get_resume, resume_ready, find_resume_by_hash, save_transcript, get_transcript
+)
 
 # Create FastAPI app
 app = FastAPI()
 
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "http://localhost:5173",
-        "https://*.vercel.app",   
-        "https://ai-career-copilot-nine.vercel.app",
-        "https://aicareercopilot.net",                   
-        "https://www.aicareercopilot.net",  
-    ],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
 # Check API key
 api_key = os.getenv("OPENAI_API_KEY")
 if not api_key:
@@ -43,12 +53,39 @@ if not api_key:
 else:
     print("✅ OpenAI API key loaded successfully")
 
-# Initialize OpenAI
-client = OpenAI(api_key=api_key)
+# Per-job scoring limits for /api/jobs/search. Concurrency defaults to top_k
+# so the default refine is one wave of LLM calls, about one round trip.
+JOB_SCORING_TOP_K = int(os.getenv("JOB_SCORING_TOP_K", "10"))
+JOB_SCORING_CONCURRENCY = int(os.getenv("JOB_SCORING_CONCURRENCY", str(JOB_SCORING_TOP_K)))
+JOB_SCORING_TIMEOUT_SECONDS = float(os.getenv("JOB_SCORING_TIMEOUT_SECONDS", "15"))
+JOB_SEARCH_RESULTS = int(os.getenv("JOB_SEARCH_RESULTS", "50"))
+
+# Limits for /api/job/compare/batch
+BATCH_COMPARE_MAX_JOBS = int(os.getenv("BATCH_COMPARE_MAX_JOBS", "50"))
+BATCH_COMPARE_CONCURRENCY = int(os.getenv("BATCH_COMPARE_CONCURRENCY", "5"))
+
+# Load the OpenAI SDK, NumPy and the PDF workers in the background at startup
+# instead of on the first request that needs them
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "") == "1"
+
+# Room for multipart boundaries and headers on top of PDF_MAX_BYTES
+UPLOAD_FORM_OVERHEAD_BYTES = 64 * 1024
+
+# Page sizes for /api/history
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "50"))
+HISTORY_MAX_PAGE_SIZE = int(os.getenv("HISTORY_MAX_PAGE_SIZE", "200"))
 
-# Store resume in memory (in production, use database)
-resume_storage = {}
-transcript_storage = {}
+# Background ingestion for /api/resume/upload?mode=async
+RESUME_INGEST_WORKERS = int(os.getenv("RESUME_INGEST_WORKERS", "2"))
+RESUME_INGEST_MAX_QUEUE = int(os.getenv("RESUME_INGEST_MAX_QUEUE", "100"))
+RESUME_INGEST_STALE_SECONDS = float(os.getenv("RESUME_INGEST_STALE_SECONDS", "300"))
+# How long other endpoints wait on a resume that is still being ingested
+RESUME_READY_WAIT_SECONDS = float(os.getenv("RESUME_READY_WAIT_SECONDS", "10"))
+
+def fingerprint_text(text):
+    """SHA-256 of resume text with case and layout whitespace normalized away"""
+    normalized = " ".join(text.lower().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
 
 # Models
 class JobCompareRequest(BaseModel):
@@ -57,6 +94,15 @@ class JobCompareRequest(BaseModel):
     job_title: Optional[str] = "Unknown Position"
     company: Optional[str] = "Unknown Company"
 
+class BatchJob(BaseModel):
+    job_description: str
+    job_title: Optional[str] = "Unknown Position"
+    company: Optional[str] = "Unknown Company"
+
+class BatchCompareRequest(BaseModel):
+    resume_id: str
+    jobs: List[BatchJob]
+
 class TranscriptUploadRequest(BaseModel):
     resume_id: str
     transcript_text: str
@@ -64,80 +110,478 @@ class TranscriptUploadRequest(BaseModel):
 class JobSearchRequest(BaseModel):
     resume_id: str
     keywords: Optional[str] = None
+    mode: Optional[str] = "refine"  # "refine" = local rank + LLM top-k, "fast" = local rank only
+    top_k: Optional[int] = None
 
 class ChatRequest(BaseModel):
     message: str
     resume_id: Optional[str] = None
+    session_id: Optional[str] = None  # returned by the first chat turn; send it back to continue
+
+def llm_busy(e):
+    """429 for a call the LLM scheduler turned away, telling the client when to retry"""
+    return HTTPException(
+        status_code=429,
+        detail="The AI service is busy, please try again shortly",
+        headers={"Retry-After": str(math.ceil(e.retry_after))}
+    )
+
+def llm_timeout():
+    """504 for a call that ran out of its latency budget and has no cheaper fallback"""
+    return HTTPException(status_code=504, detail="The AI service took too long, please try again")
+
+async def profile_requests(request: Request, call_next):
+    """Run a requested or sampled request under cProfile and store the profile.
+
+    The profile covers the handler up to the start of the response (not a
+    streamed body) plus PDF parsing in the worker pool; anything else the
+    event loop ran meanwhile shows up in it too.
+    """
+    reason = request_profiler.profile_reason(request)
+    handle = request_profiler.start() if reason else None
+    if handle is None:
+        return await call_next(request)
+    
+    start = time.perf_counter()
+    status = 500
+    profile_id = request_profiler.new_profile_id()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Profile-Id"] = profile_id
+        return response
+    finally:
+        stats = request_profiler.stop(handle)
+        info = {
+            "id": profile_id,
+            "method": request.method,
+            "path": request.url.path,
+            "status": status,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+            "reason": reason,
+            "created_at": datetime.now().isoformat()
+        }
+        try:
+            await asyncio.to_thread(request_profiler.save, stats, info)
+            print(f"🔬 Profiled {request.method} {request.url.path} as {profile_id}")
+        except OSError as e:
+            print(f"⚠️  Could not store profile {profile_id}: {e}")
+
+# Registered only when configured, so requests pay nothing for it otherwise
+if request_profiler.ENABLED:
+    app.middleware("http")(profile_requests)
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """Refuse resume uploads whose declared size is over the limit before reading the body"""
+    if request.url.path == "/api/resume/upload":
+        try:
+            declared = int(request.headers.get("content-length", "0"))
+        except ValueError:
+            declared = 0
+        if declared > PDF_MAX_BYTES + UPLOAD_FORM_OVERHEAD_BYTES:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"PDF is larger than {PDF_MAX_BYTES // (1024 * 1024)} MB"}
+            )
+    return await call_next(request)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Request latency by route template, so ids in paths don't explode label cardinality"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.observe_request(
+            request.method,
+            route.path if route else "unmatched",
+            status,
+            time.perf_counter() - start
+        )
+
+# CORS middleware, added last so it is outermost and early responses
+# from the middlewares above (413, profiling) get CORS headers too
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=[
+        "http://localhost:5173",
+        "https://*.vercel.app",   
+        "https://ai-career-copilot-nine.vercel.app",
+        "https://aicareercopilot.net",                   
+        "https://www.aicareercopilot.net",  
+    ],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+@app.on_event("startup")
+async def start_background_workers():
+    app.state.loop_probe = asyncio.create_task(metrics.probe_event_loop())
+    ingest_queue.start()
+    if WARMUP_ON_STARTUP:
+        app.state.warmup = asyncio.create_task(warm_up())
+    startup_report.report()
+
+async def warm_up():
+    """Pay the lazy-loading costs before traffic arrives, without delaying readiness"""
+    steps = {
+        "openai": lambda: asyncio.to_thread(get_async_client),
+        "numpy": lambda: asyncio.to_thread(rank_jobs, ["python"], [{"title": "", "description": ""}]),
+        "pdf_workers": warm_pool,
+    }
+    for name, step in steps.items():
+        start = time.perf_counter()
+        try:
+            await step()
+            print(f"🔥 Warmed up {name} in {(time.perf_counter() - start) * 1000:.0f} ms")
+        except Exception as e:
+            print(f"⚠️  Warmup of {name} failed: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    app.state.loop_probe.cancel()
+    for resume_id, placeholder, pdf_path, _ in await ingest_queue.stop(drain_timeout=10):
+        set_ingest_status(resume_id, placeholder, "failed", "queued", "Server restarted before processing, please upload again")
+        remove_spool(pdf_path)
+    shutdown_pool()
+    await asyncio.to_thread(flush_writes)
+    await close_adzuna_client()
 
 @app.get("/")
 def home():
     return {"message": "AI Career Copilot is running! 🚀", "version": "2.0"}
 
-@app.post("/api/resume/upload")
-async def upload_resume(file: UploadFile = File(...)):
-    """Upload and analyze a resume PDF"""
-    
-    print(f"📄 Received file: {file.filename}")
+def resume_response(resume_id, resume, duplicate=False):
+    """Upload response for a stored resume"""
+    return {
+        "resume_id": resume_id,
+        "skills": resume["skills"],
+        "preview": resume["text"][:300] + "...",
+        "duplicate": duplicate
+    }
+
+async def extract_resume_fields(resume_text):
+    """Skills and profile fields for a resume, matched locally when that finds enough.
+
+    Falls back to the LLM when the local pass looks thin (or
+    SKILL_EXTRACTION_MODE=llm), and back to the local result if the LLM fails.
+    """
+    local, confident = extract_resume_profile(resume_text)
+    if SKILL_EXTRACTION_MODE == "local" or (SKILL_EXTRACTION_MODE == "auto" and confident):
+        print(f"⚡ Extracted {len(local['skills'])} skills locally")
+        return local
     
-    try:
-        # Read the PDF
-        pdf_bytes = await file.read()
-        print(f"✅ File read successfully: {len(pdf_bytes)} bytes")
-        
-        # Extract text
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        resume_text = ""
-        for page in doc:
-            resume_text += page.get_text()
-        
-        print(f"✅ Extracted {len(resume_text)} characters from PDF")
-        
-        if len(resume_text) < 50:
-            raise HTTPException(status_code=400, detail="Resume appears to be empty or unreadable")
-        
-        # Ask GPT to extract skills
-        prompt = f"""Extract the key technical and professional skills from this resume. 
+    # Ask GPT to extract skills plus the compact digest later prompts reuse
+    prompt = f"""Extract the key technical and professional skills from this resume, plus a compact profile.
 Return ONLY a JSON object with this exact format:
 {{
-  "skills": ["Python", "SQL", "React", "Communication", ...]
+  "skills": ["Python", "SQL", "React", "Communication", ...],
+  "roles": ["Data Analyst Intern at Acme (2023)", ...],
+  "achievements": ["Cut reporting time 40% by automating ETL in Python", ...],
+  "years_experience": 2
 }}
+Keep at most 5 roles and the 5 strongest, quantified achievements (one line each).
 
 Resume:
 {resume_text[:2000]}"""
-        
-        print("🤖 Calling OpenAI API...")
-        
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"}
+    
+    print("🤖 Calling OpenAI API...")
+    
+    try:
+        content = await chat_completion(
+            [{"role": "user", "content": prompt}],
+            response_format={"type": "json_object"},
+            endpoint="resume_skills"
         )
-        
-        print("✅ OpenAI response received")
-        
-        skills_data = json.loads(response.choices[0].message.content)
-        
-        # Store resume
-        resume_id = f"resume_{len(resume_storage) + 1}"
-        resume_storage[resume_id] = {
-            "text": resume_text,
-            "skills": skills_data.get("skills", []),
-            "filename": file.filename,
-            "uploaded_at": datetime.now().isoformat()
-        }
-        
-        print(f"✅ Resume stored with ID: {resume_id}")
-        print(f"✅ Found {len(skills_data.get('skills', []))} skills")
-        
+        extracted = json.loads(content)
+    except Exception as e:
+        if not local["skills"]:
+            raise
+        print(f"⚠️  Skill extraction fell back to local matches: {e}")
+        return local
+    
+    print("✅ OpenAI response received")
+    return extracted
+
+async def extract_transcript_fields(transcript_text):
+    """GPA, courses and honors from a transcript, local first like extract_resume_fields"""
+    local, confident = extract_transcript(transcript_text)
+    if SKILL_EXTRACTION_MODE == "local" or (SKILL_EXTRACTION_MODE == "auto" and confident):
+        print(f"⚡ Extracted {len(local['relevant_courses'])} courses locally")
+        return local
+    
+    # Ask GPT to extract coursework and GPA
+    prompt = f"""Extract relevant academic information from this transcript.
+Return ONLY a JSON object:
+{{
+  "gpa": 3.75,
+  "relevant_courses": ["Data Structures", "Machine Learning", "Databases"],
+  "honors": ["Dean's List", "Magna Cum Laude"]
+}}
+
+Transcript:
+{transcript_text[:1500]}"""
+    
+    try:
+        content = await chat_completion(
+            [{"role": "user", "content": prompt}],
+            response_format={"type": "json_object"},
+            endpoint="transcript"
+        )
+        return json.loads(content)
+    except Exception as e:
+        if local["gpa"] is None and not local["relevant_courses"]:
+            raise
+        print(f"⚠️  Transcript extraction fell back to local matches: {e}")
+        return local
+
+async def ingest_resume(pdf_path, filename, pdf_hash, resume_id=None, on_stage=None):
+    """Extract text and skills from a resume PDF and store the profile.
+
+    `on_stage(stage)` is told when each slow step starts. Returns
+    (resume_id, record); validation failures raise HTTPException.
+    """
+    if on_stage:
+        on_stage("parsing_pdf")
+    
+    # Extract text off the event loop, in the PDF worker pool
+    try:
+        resume_text = await extract_pdf_text(pdf_path)
+    except PdfTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except PdfUnreadableError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=422, detail="Resume PDF took too long to process")
+    
+    print(f"✅ Extracted {len(resume_text)} characters from PDF")
+    
+    if len(resume_text) < 50:
+        raise HTTPException(status_code=400, detail="Resume appears to be empty or unreadable")
+    
+    # Same text in a different file (re-exported PDF): reuse its skills
+    text_hash = fingerprint_text(resume_text)
+    source_id, source = find_resume_by_hash("text_sha256", text_hash)
+    if source:
+        skills = source["skills"]
+        digest = digest_for(source)
+        print(f"♻️  Reusing skills from {source_id}")
+    else:
+        if on_stage:
+            on_stage("extracting_skills")
+        extracted = await extract_resume_fields(resume_text)
+        skills = extracted.get("skills", [])
+        digest = build_digest(extracted, resume_text)
+    
+    # Store resume
+    resume_id = resume_id or new_resume_id()
+    record = {
+        "text": resume_text,
+        "skills": skills,
+        "filename": filename,
+        "uploaded_at": datetime.now().isoformat(),
+        "pdf_sha256": pdf_hash,
+        "text_sha256": text_hash,
+        "digest": digest
+    }
+    save_resume(resume_id, record)
+    
+    print(f"✅ Resume stored with ID: {resume_id}")
+    print(f"✅ Found {len(skills)} skills")
+    
+    return resume_id, record
+
+def set_ingest_status(resume_id, placeholder, status, stage, error=None):
+    """Store a queued resume's progress and wake anyone waiting on it"""
+    placeholder.update({
+        "status": status,
+        "stage": stage,
+        "error": error,
+        "updated_at": datetime.now().isoformat()
+    })
+    save_resume(resume_id, placeholder)
+    notify_change(resume_id)
+
+async def run_ingest_task(task):
+    """Background worker body for asynchronous uploads"""
+    resume_id, placeholder, pdf_path, pdf_hash = task
+    try:
+        await ingest_resume(
+            pdf_path,
+            placeholder["filename"],
+            pdf_hash,
+            resume_id=resume_id,
+            on_stage=lambda stage: set_ingest_status(resume_id, placeholder, "processing", stage)
+        )
+        notify_change(resume_id)
+    except HTTPException as e:
+        set_ingest_status(resume_id, placeholder, "failed", placeholder["stage"], e.detail)
+    except LLMOverloaded:
+        set_ingest_status(resume_id, placeholder, "failed", placeholder["stage"], "The AI service is busy, please upload again shortly")
+    except Exception as e:
+        print(f"❌ ERROR ingesting {resume_id}: {str(e)}")
+        set_ingest_status(resume_id, placeholder, "failed", placeholder["stage"], f"Error processing resume: {str(e)}")
+    finally:
+        remove_spool(pdf_path)
+
+ingest_queue = TaskQueue("Resume ingestion", run_ingest_task, RESUME_INGEST_WORKERS, RESUME_INGEST_MAX_QUEUE)
+
+def ingest_status(resume_id, resume):
+    """Public status of a resume: processing, ready or failed"""
+    if resume_ready(resume):
         return {
             "resume_id": resume_id,
-            "skills": skills_data.get("skills", []),
-            "preview": resume_text[:300] + "..."
+            "status": "ready",
+            "skills": resume["skills"],
+            "preview": resume["text"][:300] + "..."
         }
+    
+    status = {
+        "resume_id": resume_id,
+        "status": resume["status"],
+        "stage": resume.get("stage"),
+        "error": resume.get("error")
+    }
+    # A worker that died mid-task leaves its placeholder behind. Every stage a
+    # worker starts refreshes updated_at, but a placeholder still waiting in
+    # the queue keeps its submit time however long the backlog is, so age
+    # only counts once a worker has picked the upload up.
+    updated_at = datetime.fromisoformat(resume["updated_at"])
+    if (status["status"] == "processing" and status["stage"] != "queued"
+            and (datetime.now() - updated_at).total_seconds() > RESUME_INGEST_STALE_SECONDS):
+        status.update({"status": "failed", "error": "Processing was interrupted, please upload again"})
+    return status
+
+async def require_resume(resume_id, wait=RESUME_READY_WAIT_SECONDS):
+    """The ingested resume, waiting up to `wait` seconds for one still processing.
+
+    404 if unknown, 409 (with Retry-After) if still processing, 422 if ingestion failed.
+    """
+    deadline = time.monotonic() + wait
+    while True:
+        resume = get_resume(resume_id)
+        if not resume:
+            raise HTTPException(status_code=404, detail="Resume not found")
+        status = ingest_status(resume_id, resume)
+        if status["status"] == "ready":
+            return resume
+        if status["status"] == "failed":
+            raise HTTPException(status_code=422, detail=f"Resume could not be processed: {status['error']}")
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise HTTPException(
+                status_code=409,
+                detail="Resume is still being processed",
+                headers={"Retry-After": "2"}
+            )
+        await wait_for_change(resume_id, min(remaining, 1.0))
+
+@app.post("/api/resume/upload")
+async def upload_resume(file: UploadFile = File(...), mode: str = "sync"):
+    """Upload and analyze a resume PDF.
+
+    mode="async" returns 202 with the resume_id as soon as the file is read;
+    poll /api/resume/{resume_id}/status or stream /events for the result.
+    """
+    
+    print(f"📄 Received file: {file.filename}")
+    
+    pdf_path = None
+    try:
+        # Spool the PDF to a size-capped temp file, hashing it on the way
+        try:
+            pdf_path, pdf_size, pdf_hash = await asyncio.to_thread(spool_upload, file.file)
+        except PdfTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        print(f"✅ File read successfully: {pdf_size} bytes")
+        
+        # Same bytes as an earlier upload: reuse its extraction under a new id,
+        # so only the work is shared and not that upload's history or transcript
+        existing_id, existing = find_resume_by_hash("pdf_sha256", pdf_hash)
+        if existing:
+            resume_id = new_resume_id()
+            record = {
+                "text": existing["text"],
+                "skills": existing["skills"],
+                "filename": file.filename,
+                "uploaded_at": datetime.now().isoformat(),
+                "pdf_sha256": pdf_hash,
+                "text_sha256": existing.get("text_sha256") or fingerprint_text(existing["text"]),
+                "digest": digest_for(existing)
+            }
+            save_resume(resume_id, record)
+            print(f"♻️  Duplicate upload of {existing_id}, reusing its extraction as {resume_id}")
+            return resume_response(resume_id, record, duplicate=True)
+        
+        if mode == "async":
+            resume_id = new_resume_id()
+            placeholder = {"filename": file.filename, "uploaded_at": datetime.now().isoformat()}
+            set_ingest_status(resume_id, placeholder, "processing", "queued")
+            try:
+                ingest_queue.submit((resume_id, placeholder, pdf_path, pdf_hash))
+            except asyncio.QueueFull:
+                set_ingest_status(resume_id, placeholder, "failed", "queued", "Too many uploads in progress")
+                raise HTTPException(status_code=503, detail="Too many uploads in progress, please try again shortly", headers={"Retry-After": "10"})
+            pdf_path = None  # the ingestion task deletes it now
+            print(f"📥 Queued {resume_id} for ingestion ({ingest_queue.depth()} waiting)")
+            return JSONResponse(status_code=202, content={
+                "resume_id": resume_id,
+                "status": "processing",
+                "status_url": f"/api/resume/{resume_id}/status",
+                "events_url": f"/api/resume/{resume_id}/events"
+            })
         
+        resume_id, record = await ingest_resume(pdf_path, file.filename, pdf_hash)
+        return resume_response(resume_id, record)
+        
+    except HTTPException:
+        raise
+    except LLMOverloaded as e:
+        raise llm_busy(e)
     except Exception as e:
         print(f"❌ ERROR: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing resume: {str(e)}")
+    finally:
+        if pdf_path:
+            remove_spool(pdf_path)
+
+@app.get("/api/resume/{resume_id}/status")
+def resume_status(resume_id: str):
+    """Ingestion status of an uploaded resume"""
+    resume = get_resume(resume_id)
+    if not resume:
+        raise HTTPException(status_code=404, detail="Resume not found")
+    return ingest_status(resume_id, resume)
+
+@app.get("/api/resume/{resume_id}/events")
+async def resume_events(resume_id: str):
+    """Ingestion progress as Server-Sent Events: a `status` event per stage, ending with `done`"""
+    if not get_resume(resume_id):
+        raise HTTPException(status_code=404, detail="Resume not found")
+    
+    async def events():
+        last = None
+        while True:
+            status = ingest_status(resume_id, get_resume(resume_id))
+            if status["status"] != "processing":
+                yield sse_event(status, event="done")
+                return
+            if status != last:
+                yield sse_event(status, event="status")
+                last = status
+            await wait_for_change(resume_id, 1.0)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.post("/api/transcript/upload")
 async def upload_transcript(req: TranscriptUploadRequest):
@@ -146,79 +590,95 @@ async def upload_transcript(req: TranscriptUploadRequest):
     print(f"📜 Received transcript for resume: {req.resume_id}")
     
     try:
-        # Ask GPT to extract coursework and GPA
-        prompt = f"""Extract relevant academic information from this transcript.
-Return ONLY a JSON object:
-{{
-  "gpa": 3.75,
-  "relevant_courses": ["Data Structures", "Machine Learning", "Databases"],
-  "honors": ["Dean's List", "Magna Cum Laude"]
-}}
-
-Transcript:
-{req.transcript_text[:1500]}"""
-        
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"}
-        )
-        
-        transcript_data = json.loads(response.choices[0].message.content)
+        transcript_data = await extract_transcript_fields(req.transcript_text)
         
         # Store transcript
-        transcript_storage[req.resume_id] = transcript_data
+        save_transcript(req.resume_id, transcript_data)
         
         print(f"✅ Transcript stored for {req.resume_id}")
         
         return transcript_data
         
+    except LLMOverloaded as e:
+        raise llm_busy(e)
     except Exception as e:
         print(f"❌ ERROR: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing transcript: {str(e)}")
 
-@app.post("/api/job/compare")
-async def compare_job(req: JobCompareRequest):
-    """Compare resume to job description"""
-    
-    print(f"🔍 Comparing job for resume: {req.resume_id}")
-    
-    resume = resume_storage.get(req.resume_id)
-    if not resume:
-        raise HTTPException(status_code=404, detail="Resume not found")
-    
-    # Get transcript if available
-    transcript = transcript_storage.get(req.resume_id)
-    transcript_context = ""
-    if transcript:
-        transcript_context = f"\nTranscript Data: GPA: {transcript.get('gpa')}, Courses: {', '.join(transcript.get('relevant_courses', []))}"
-    
-    try:
-        prompt = f"""Compare this resume with the job description.
+# Fixed instructions go first (as the system message) and the per-resume
+# profile next, so repeated calls share a stable prefix for provider-side
+# prompt caching; only the job-specific part at the end varies.
+COMPARE_INSTRUCTIONS = """Compare the candidate profile with the job description.
 
 Return ONLY a JSON object with this EXACT format:
-{{
+{
   "fit_score": 75,
   "missing_skills": ["Tableau", "Statistics"],
   "matching_skills": ["Python", "SQL"],
   "recommendation": "You're a good fit but should learn Tableau and brush up on Statistics."
-}}
+}"""
 
-Resume Skills: {', '.join(resume['skills'])}{transcript_context}
+COVER_LETTER_INSTRUCTIONS = """Write a professional, one-page cover letter for the job below.
 
-Full Resume:
-{resume['text'][:1000]}
+Guidelines:
+- Be specific and mention concrete achievements from the candidate profile
+- Show enthusiasm for the company
+- Keep it under 300 words
+- Don't use placeholders"""
 
-Job Description:
-{req.job_description[:1000]}"""
-        
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"}
+JOB_SCORE_INSTRUCTIONS = """Rate how well the candidate matches the job (0-100).
+Consider skills, experience, and job requirements.
+Return ONLY a number between 0-100."""
+
+def candidate_profile(resume_id, resume, max_courses=None):
+    """Digest of the resume plus transcript highlights, rendered the same way on every call"""
+    profile = f"Candidate profile:\n{render_digest(digest_for(resume))}"
+    
+    # Get transcript if available
+    transcript = get_transcript(resume_id)
+    if transcript:
+        courses = transcript.get('relevant_courses', [])[:max_courses]
+        profile += f"\nAcademic: GPA {transcript.get('gpa')}, relevant courses: {', '.join(courses)}"
+    return profile
+
+def job_requirements(job_title, job_description):
+    """The posting's cached requirements digest, rendered for a prompt"""
+    return f"Job requirements:\n{render_job_digest(job_digest(job_description, job_title))}"
+
+async def run_comparison(resume_id, resume, job_title, job_description):
+    """Ask the LLM to compare a resume with one job description"""
+    messages = [
+        {"role": "system", "content": COMPARE_INSTRUCTIONS},
+        {"role": "user", "content": f"""{candidate_profile(resume_id, resume)}
+
+Position: {job_title}
+{job_requirements(job_title, job_description)}"""}
+    ]
+    
+    try:
+        content = await chat_completion(
+            messages,
+            response_format={"type": "json_object"},
+            endpoint="job_compare"
         )
-        
-        result = json.loads(response.choices[0].message.content)
+    except asyncio.TimeoutError:
+        # Out of latency budget: answer from skill overlap instead of failing
+        print(f"⏱️  Comparison for {resume_id} ran out of time, using the local estimate")
+        metrics.record_llm_call("job_compare", "fallback")
+        return compare_locally(resume["skills"], job_digest(job_description, job_title))
+    
+    return json.loads(content)
+
+@app.post("/api/job/compare")
+async def compare_job(req: JobCompareRequest):
+    """Compare resume to job description"""
+    
+    print(f"🔍 Comparing job for resume: {req.resume_id}")
+    
+    resume = await require_resume(req.resume_id)
+    
+    try:
+        result = await run_comparison(req.resume_id, resume, req.job_title, req.job_description)
         print(f"✅ Fit score: {result.get('fit_score')}%")
         
         # Save to history
@@ -230,113 +690,351 @@ Job Description:
         
         return result
         
+    except LLMOverloaded as e:
+        raise llm_busy(e)
     except Exception as e:
         print(f"❌ ERROR: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error comparing job: {str(e)}")
 
+def merge_missing_skills(results):
+    """Missing skills across many comparisons, deduplicated, most frequent first"""
+    counts = {}
+    names = {}
+    for result in results:
+        for skill in result.get("missing_skills", []):
+            key = normalize_skill(skill)
+            if key:
+                counts[key] = counts.get(key, 0) + 1
+                names.setdefault(key, skill)
+    return [names[key] for key in sorted(counts, key=lambda k: -counts[k])]
+
+@app.post("/api/job/compare/batch")
+async def compare_jobs_batch(req: BatchCompareRequest):
+    """Compare one resume against many job descriptions, streamed as Server-Sent Events.
+
+    Emits a `result` (or `error`) event per job as it finishes, then one
+    `done` event with a single learning path for the batch's missing skills.
+    """
+    
+    print(f"🔍 Batch comparing {len(req.jobs)} jobs for resume: {req.resume_id}")
+    
+    resume = await require_resume(req.resume_id)
+    if not req.jobs:
+        raise HTTPException(status_code=400, detail="No jobs to compare")
+    if len(req.jobs) > BATCH_COMPARE_MAX_JOBS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_COMPARE_MAX_JOBS} jobs per batch")
+    try:
+        llm_scheduler.check_admission()
+    except LLMOverloaded as e:
+        raise llm_busy(e)
+    
+    semaphore = asyncio.Semaphore(BATCH_COMPARE_CONCURRENCY)
+    
+    async def compare_one(index, job):
+        async with semaphore:
+            try:
+                return index, await run_comparison(req.resume_id, resume, job.job_title, job.job_description), None
+            except Exception as e:
+                return index, None, e
+    
+    async def events():
+        tasks = [asyncio.create_task(compare_one(i, job)) for i, job in enumerate(req.jobs)]
+        completed = {}
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, result, error = await next_done
+                job = req.jobs[index]
+                if error:
+                    print(f"⚠️  Batch job {index} failed: {error}")
+                    yield sse_event({"index": index, "detail": str(error)}, event="error")
+                    continue
+                completed[index] = result
+                yield sse_event({"index": index, "job_title": job.job_title, "company": job.company, **result}, event="result")
+            
+            learning_path = generate_learning_path(merge_missing_skills(completed.values()))
+            yield sse_event({
+                "completed": len(completed),
+                "failed": len(req.jobs) - len(completed),
+                "learning_path": learning_path
+            }, event="done")
+        finally:
+            # Stop outstanding comparisons if the client went away, and save what finished
+            for task in tasks:
+                task.cancel()
+            add_analyses(req.resume_id, [
+                (req.jobs[index].job_title, req.jobs[index].company, completed[index])
+                for index in sorted(completed)
+            ])
+            print(f"✅ Batch saved {len(completed)} of {len(req.jobs)} comparisons")
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def build_cover_letter_messages(req, resume):
+    """Cover letter messages for a resume and job description"""
+    return [
+        {"role": "system", "content": COVER_LETTER_INSTRUCTIONS},
+        {"role": "user", "content": f"""{candidate_profile(req.resume_id, resume, max_courses=3)}
+
+Company: {req.company}
+Position: {req.job_title}
+{job_requirements(req.job_title, req.job_description)}"""}
+    ]
+
+def sse_event(data, event=None):
+    """Format one Server-Sent Event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+def stream_sse(messages, done_key, endpoint, on_complete=None, headers=None):
+    """Stream an LLM reply as SSE `delta` events followed by one `done` event.
+
+    `on_complete` receives the full text once the stream ends cleanly; a
+    client disconnect cancels the generator before it runs.
+    """
+    # Turn the request away now, while a 429 can still be sent
+    try:
+        llm_scheduler.check_admission()
+    except LLMOverloaded as e:
+        raise llm_busy(e)
+    
+    async def events():
+        parts = []
+        try:
+            async for delta in stream_chat_completion(messages, endpoint=endpoint):
+                parts.append(delta)
+                yield sse_event({"delta": delta})
+            text = "".join(parts)
+            if on_complete:
+                on_complete(text)
+            yield sse_event({done_key: text}, event="done")
+        except Exception as e:
+            print(f"❌ STREAM ERROR: {str(e)}")
+            yield sse_event({"detail": str(e)}, event="error")
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **(headers or {})}
+    )
+
 @app.post("/api/cover-letter/generate")
 async def generate_cover_letter(req: JobCompareRequest):
     """Generate a cover letter"""
     
     print(f"✍️  Generating cover letter for resume: {req.resume_id}")
     
-    resume = resume_storage.get(req.resume_id)
-    if not resume:
-        raise HTTPException(status_code=404, detail="Resume not found")
-    
-    # Get transcript if available
-    transcript = transcript_storage.get(req.resume_id)
-    transcript_context = ""
-    if transcript:
-        courses = ', '.join(transcript.get('relevant_courses', [])[:3])
-        transcript_context = f"\nAcademic: GPA {transcript.get('gpa')}, relevant courses: {courses}"
+    resume = await require_resume(req.resume_id)
     
     try:
-        prompt = f"""Write a professional, one-page cover letter for this job.
-
-Guidelines:
-- Be specific and mention concrete achievements from the resume
-- Show enthusiasm for {req.company}
-- Keep it under 300 words
-- Don't use placeholders{transcript_context}
-
-Resume:
-{resume['text'][:1500]}
-
-Job Description:
-{req.job_description[:1000]}"""
-        
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}]
+        cover_letter = await chat_completion(
+            build_cover_letter_messages(req, resume),
+            endpoint="cover_letter"
         )
         
         print("✅ Cover letter generated")
         
         return {
-            "cover_letter": response.choices[0].message.content
+            "cover_letter": cover_letter
         }
         
+    except LLMOverloaded as e:
+        raise llm_busy(e)
+    except asyncio.TimeoutError:
+        raise llm_timeout()
     except Exception as e:
         print(f"❌ ERROR: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error generating cover letter: {str(e)}")
 
+@app.post("/api/cover-letter/generate/stream")
+async def generate_cover_letter_stream(req: JobCompareRequest):
+    """Generate a cover letter, streamed as Server-Sent Events"""
+    
+    print(f"✍️  Streaming cover letter for resume: {req.resume_id}")
+    
+    resume = await require_resume(req.resume_id)
+    
+    return stream_sse(build_cover_letter_messages(req, resume), "cover_letter", "cover_letter")
+
+async def score_job_match(resume, job, deadline):
+    """Ask the LLM for a 0-100 match score between a resume and one job"""
+    messages = [
+        {"role": "system", "content": JOB_SCORE_INSTRUCTIONS},
+        {"role": "user", "content": f"""Candidate profile:
+{render_digest(digest_for(resume))}
+
+Job: {job['title']}
+{job_requirements(job['title'], job['description'])}"""}
+    ]
+
+    score = await chat_completion(
+        messages,
+        timeout=JOB_SCORING_TIMEOUT_SECONDS,
+        endpoint="job_score",
+        deadline=deadline
+    )
+
+    match = re.search(r"\d+", score or "")
+    if not match:
+        raise ValueError(f"No score in LLM reply: {score!r}")
+    return min(100, int(match.group()))
+
 @app.post("/api/jobs/search")
 async def search_jobs_endpoint(req: JobSearchRequest):
     """Search for jobs based on resume skills"""
     
     print(f"🔍 Searching jobs for resume: {req.resume_id}")
     
-    resume = resume_storage.get(req.resume_id)
-    if not resume:
-        raise HTTPException(status_code=404, detail="Resume not found")
+    resume = await require_resume(req.resume_id)
     
     try:
         # Use provided keywords or generate from skills
         keywords = req.keywords or ' '.join(resume['skills'][:3])
         
         print(f"Searching for: {keywords}")
-        jobs = search_jobs(keywords)
+        jobs = await search_jobs(keywords, results_per_page=JOB_SEARCH_RESULTS)
         
-        # Calculate match score for each job using AI
-        for job in jobs:
-            try:
-                prompt = f"""Rate how well this resume matches this job (0-100).
-Consider skills, experience, and job requirements.
-Return ONLY a number between 0-100.
-
-Resume skills: {', '.join(resume['skills'])}
-Job: {job['title']} - {job['description'][:200]}"""
-                
-                response = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                
-                score = response.choices[0].message.content.strip()
-                job['match_score'] = int(''.join(filter(str.isdigit, score))) if score else 70
-            except:
-                job['match_score'] = 70  # Default score
+        # Rank every job locally in one vectorized pass
+        for job, score in zip(jobs, rank_jobs(resume['skills'], jobs)):
+            job['match_score'] = score
+            job['score_source'] = "local"
+        jobs.sort(key=lambda x: x['match_score'], reverse=True)
+        
+        # Only the best local candidates are refined by the LLM
+        top_k = 0 if req.mode == "fast" else max(0, req.top_k if req.top_k is not None else JOB_SCORING_TOP_K)
+        candidates = jobs[:top_k]
+        # One budget for the whole pass, so more jobs can't mean a longer wait
+        deadline = time.monotonic() + endpoint_budget("job_score")
+        scores = await map_bounded(
+            lambda job: score_job_match(resume, job, deadline),
+            candidates,
+            JOB_SCORING_CONCURRENCY
+        )
         
-        # Sort by match score
-        jobs.sort(key=lambda x: x.get('match_score', 0), reverse=True)
+        # A failed or timed-out call keeps the job's local score
+        failed = 0
+        for job, score in zip(candidates, scores):
+            if isinstance(score, BaseException):
+                print(f"⚠️  Scoring failed for job {job.get('id')}: {score!r}")
+                metrics.record_llm_call("job_score", "fallback")
+                failed += 1
+            else:
+                job['match_score'] = score
+                job['score_source'] = "llm"
         
-        print(f"✅ Found {len(jobs)} jobs")
-        return {"jobs": jobs}
+        jobs.sort(key=lambda x: x['match_score'], reverse=True)
+        
+        print(f"✅ Found {len(jobs)} jobs ({len(candidates) - failed} LLM-scored, {failed} failed)")
+        return {"jobs": jobs, "partial": failed > 0}
         
     except Exception as e:
         print(f"❌ ERROR: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error searching jobs: {str(e)}")
 
 @app.get("/api/history/{resume_id}")
-async def get_history(resume_id: str):
-    """Get job analysis history"""
+async def get_history(resume_id: str, limit: int = HISTORY_PAGE_SIZE, cursor: Optional[str] = None):
+    """Get job analysis history, newest first, one page at a time.
+
+    Pass the returned next_cursor to get the next page; it is null on the last one.
+    """
     try:
-        history = get_analysis_history(resume_id)
-        return {"history": history}
+        history, next_cursor = get_analysis_page(resume_id, max(1, min(limit, HISTORY_MAX_PAGE_SIZE)), cursor)
+        return {
+            "history": history,
+            "next_cursor": next_cursor,
+            "total": get_analysis_stats(resume_id)["count"]
+        }
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/history/{resume_id}/stats")
+async def get_history_stats(resume_id: str):
+    """Analysis count, average and best fit score, first and last analysis time"""
+    return get_analysis_stats(resume_id)
+
+@app.get("/api/history/{resume_id}/trend")
+async def get_history_trend(resume_id: str, days: int = 30):
+    """Average fit score per day with analyses over the last `days` calendar days"""
+    return {"fit_trend": get_fit_trend(resume_id, max(1, min(days, 365)))}
+
+@app.get("/api/history/{resume_id}/missing-skills")
+async def get_history_missing_skills(resume_id: str, limit: int = 10):
+    """Skills most often missing across this resume's analyses"""
+    return {"missing_skills": get_top_missing_skills(resume_id, max(1, min(limit, 100)))}
+
+@app.get("/api/history/{resume_id}/companies")
+async def get_history_companies(resume_id: str, limit: int = 20):
+    """Analysis count and fit scores per company"""
+    return {"companies": get_company_stats(resume_id, max(1, min(limit, 100)))}
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus scrape endpoint: request/stage latency histograms, LLM calls and tokens"""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+def require_profile_token(request):
+    """404 unless profiling is configured and the request carries PROFILE_TOKEN"""
+    token = request.headers.get(request_profiler.PROFILE_HEADER) or request.query_params.get("profile")
+    if not request_profiler.token_matches(token):
+        raise HTTPException(status_code=404, detail="Not found")
+
+@app.get("/api/profiles")
+async def list_request_profiles(request: Request):
+    """Recently stored request profiles, newest first"""
+    require_profile_token(request)
+    return {"profiles": await asyncio.to_thread(request_profiler.list_profiles)}
+
+@app.get("/api/profiles/{profile_id}")
+async def download_request_profile(profile_id: str, request: Request, format: str = "prof"):
+    """A stored profile: the raw .prof file (pstats/snakeviz), or ?format=text for a summary"""
+    require_profile_token(request)
+    path = request_profiler.profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "text":
+        return Response(await asyncio.to_thread(request_profiler.render_text, path), media_type="text/plain")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+
+@app.get("/api/llm-cache/stats")
+def llm_cache_stats():
+    """LLM response cache size and hit/miss counters per endpoint"""
+    return llm_cache.snapshot()
+
+def chat_session_id(req):
+    """Conversation key: the client's session, minted on its first turn.
+
+    Never derived from the resume id: identical uploads share one resume id,
+    and their owners must not share a conversation.
+    """
+    if not req.session_id:
+        req.session_id = chat_memory.new_session_id()
+    return req.session_id
+
+def build_chat_messages(req):
+    """System context, this session's history within the token budget, and the new user message"""
+    # Build context
+    context = "You are an expert career coach helping with job applications, resume tips, and career advice."
+    
+    if req.resume_id:
+        resume = get_resume(req.resume_id)
+        if resume and resume_ready(resume):
+            context += f"\n\nUser's skills: {', '.join(resume['skills'][:10])}"
+    
+    return chat_memory.build_messages(context, chat_session_id(req), req.message)
+
+def save_chat_turn(req, ai_response):
+    """Persist a finished turn and roll older turns into the session summary"""
+    session_id = chat_session_id(req)
+    record = add_chat_message(req.message, ai_response, session_id)
+    chat_memory.record_turn(session_id, record)
+    chat_memory.schedule_summary(session_id)
+
 @app.post("/api/chat")
 async def career_chat(req: ChatRequest):
     """AI Career Coach chat"""
@@ -344,40 +1042,44 @@ async def career_chat(req: ChatRequest):
     print(f"💬 Chat message: {req.message[:50]}...")
     
     try:
-        # Build context
-        context = "You are an expert career coach helping with job applications, resume tips, and career advice."
-        
-        if req.resume_id:
-            resume = resume_storage.get(req.resume_id)
-            if resume:
-                context += f"\n\nUser's skills: {', '.join(resume['skills'][:10])}"
-        
-        # Get recent chat history
-        history = get_chat_history(5)
-        messages = [{"role": "system", "content": context}]
-        
-        for msg in history:
-            messages.append({"role": "user", "content": msg["user_message"]})
-            messages.append({"role": "assistant", "content": msg["ai_response"]})
-        
-        messages.append({"role": "user", "content": req.message})
-        
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages
-        )
+        messages = build_chat_messages(req)
         
-        ai_response = response.choices[0].message.content
+        ai_response = await chat_completion(messages, endpoint="chat")
         
         # Save to history
-        add_chat_message(req.message, ai_response)
+        save_chat_turn(req, ai_response)
         
         print("✅ Chat response generated")
         
-        return {"response": ai_response}
+        return {"response": ai_response, "session_id": chat_session_id(req)}
         
+    except LLMOverloaded as e:
+        raise llm_busy(e)
+    except asyncio.TimeoutError:
+        raise llm_timeout()
     except Exception as e:
         print(f"❌ ERROR: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error in chat: {str(e)}")
 
+@app.post("/api/chat/stream")
+async def career_chat_stream(req: ChatRequest):
+    """AI Career Coach chat, streamed as Server-Sent Events"""
+    
+    print(f"💬 Streaming chat message: {req.message[:50]}...")
+    
+    try:
+        messages = build_chat_messages(req)
+    except Exception as e:
+        print(f"❌ ERROR: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error in chat: {str(e)}")
+    
+    # Persist once the full reply has streamed
+    return stream_sse(
+        messages,
+        "response",
+        "chat",
+        on_complete=lambda text: save_chat_turn(req, text),
+        headers={"X-Session-Id": chat_session_id(req)}
+    )
+
 # Run with: uvicorn main:app --reload
\ No newline at end of file
@@ -1,50 +1,118 @@
-import requests
+import asyncio
+import math
 import os
+import time
+from collections import OrderedDict
+from services.metrics import span
+from services.task_queue import SingleFlight
 
 ADZUNA_APP_ID = os.getenv("ADZUNA_APP_ID", "")
 ADZUNA_APP_KEY = os.getenv("ADZUNA_APP_KEY", "")
+ADZUNA_BASE_URL = os.getenv("ADZUNA_BASE_URL", "https://api.adzuna.com/v1/api/jobs")
+
+ADZUNA_PAGE_SIZE = 50  # Adzuna's maximum results_per_page
+ADZUNA_TIMEOUT_SECONDS = float(os.getenv("ADZUNA_TIMEOUT_SECONDS", "10"))
+ADZUNA_CACHE_TTL_SECONDS = float(os.getenv("ADZUNA_CACHE_TTL_SECONDS", "600"))
+ADZUNA_CACHE_MAX_ENTRIES = int(os.getenv("ADZUNA_CACHE_MAX_ENTRIES", "512"))
+
+_client = None
+_page_cache = OrderedDict()  # (keywords, location, page, per_page) -> (expires_at, jobs)
+_inflight = SingleFlight()  # identical concurrent searches share one request
+
+def get_client():
+    """Shared HTTP client; keeps connections to Adzuna alive between searches"""
+    global _client
+    if _client is None:
+        import httpx  # deferred: only search requests need it
+        _client = httpx.AsyncClient(
+            base_url=ADZUNA_BASE_URL,
+            timeout=ADZUNA_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+        )
+    return _client
+
+async def close_client():
+    """Close the pooled connections; called on app shutdown"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def _parse_job(job):
+    return {
+        "id": job.get("id"),
+        "title": job.get("title"),
+        "company": job.get("company", {}).get("display_name", "Unknown Company"),
+        "location": job.get("location", {}).get("display_name", "Remote"),
+        "description": job.get("description", "")[:500],  # Truncate
+        "salary_min": job.get("salary_min"),
+        "salary_max": job.get("salary_max"),
+        "url": job.get("redirect_url")
+    }
+
+async def _request_page(keywords, location, page, per_page):
+    params = {
+        "app_id": ADZUNA_APP_ID,
+        "app_key": ADZUNA_APP_KEY,
+        "what": keywords,
+        "results_per_page": per_page,
+        "content-type": "application/json"
+    }
+    with span("adzuna_fetch"):
+        response = await get_client().get(f"/{location}/search/{page}", params=params)
+    response.raise_for_status()
+    return [_parse_job(job) for job in response.json().get("results", [])]
+
+def _cache_put(key, jobs):
+    now = time.time()
+    _page_cache[key] = (now + ADZUNA_CACHE_TTL_SECONDS, jobs)
+    _page_cache.move_to_end(key)
+    while len(_page_cache) > ADZUNA_CACHE_MAX_ENTRIES:
+        _page_cache.popitem(last=False)
+
+async def fetch_page(keywords, location, page, per_page):
+    """One page of results, from cache, from an identical in-flight request, or from Adzuna"""
+    key = (keywords.strip().lower(), location, page, per_page)
+
+    cached = _page_cache.get(key)
+    if cached and cached[0] > time.time():
+        return cached[1]
+
+    jobs = await _inflight.run(key, lambda: _request_page(keywords, location, page, per_page))
+    _cache_put(key, jobs)
+    return jobs
+
+async def search_jobs(keywords, location="us", results_per_page=10):
+    """Search jobs using Adzuna API, fetching all needed pages concurrently"""
 
-def search_jobs(keywords, location="us", results_per_page=10):
-    """Search jobs using Adzuna API"""
-    
     # If no API keys, return mock data
     if not ADZUNA_APP_ID or not ADZUNA_APP_KEY:
         return get_mock_jobs(keywords)
-    
-    try:
-        url = f"https://api.adzuna.com/v1/api/jobs/{location}/search/1"
-        params = {
-            "app_id": ADZUNA_APP_ID,
-            "app_key": ADZUNA_APP_KEY,
-            "what": keywords,
-            "results_per_page": results_per_page,
-            "content-type": "application/json"
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
-        jobs = []
-        
-        for job in data.get("results", []):
-            jobs.append({
-                "id": job.get("id"),
-                "title": job.get("title"),
-                "company": job.get("company", {}).get("display_name", "Unknown Company"),
-                "location": job.get("location", {}).get("display_name", "Remote"),
-                "description": job.get("description", "")[:500],  # Truncate
-                "salary_min": job.get("salary_min"),
-                "salary_max": job.get("salary_max"),
-                "url": job.get("redirect_url")
-            })
-        
-        return jobs
-    
-    except Exception as e:
-        print(f"Adzuna API error: {e}")
+
+    per_page = min(results_per_page, ADZUNA_PAGE_SIZE)
+    pages = math.ceil(results_per_page / per_page)
+    results = await asyncio.gather(
+        *(fetch_page(keywords, location, page, per_page) for page in range(1, pages + 1)),
+        return_exceptions=True
+    )
+
+    jobs = []
+    seen = set()
+    for result in results:
+        if isinstance(result, BaseException):
+            print(f"Adzuna API error: {result!r}")
+            continue
+        for job in result:
+            if job["id"] not in seen:
+                seen.add(job["id"])
+                # Copy, since callers annotate jobs and pages are cached
+                jobs.append(dict(job))
+
+    if not jobs and any(isinstance(result, BaseException) for result in results):
         return get_mock_jobs(keywords)
 
+    return jobs[:results_per_page]
+
 def get_mock_jobs(keywords):
     """Return mock job data for demo"""
     return [
@@ -78,4 +146,4 @@ def get_mock_jobs(keywords):
             "salary_max": 95000,
             "url": "https://www.amazon.jobs"
         }
-    ]
\ No newline at end of file
+    ]
@@ -0,0 +1,143 @@
+import asyncio
+import os
+import uuid
+from collections import OrderedDict, deque
+from database import get_chat_history, get_latest_chat_id, get_chat_summary, save_chat_summary
+from services.llm_service import chat_completion
+from services.llm_scheduler import text_tokens
+
+CHAT_BUFFER_TURNS = int(os.getenv("CHAT_BUFFER_TURNS", "20"))
+CHAT_WINDOW_TURNS = int(os.getenv("CHAT_WINDOW_TURNS", "8"))
+CHAT_CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", "1500"))
+CHAT_SUMMARY_BATCH = int(os.getenv("CHAT_SUMMARY_BATCH", "4"))
+CHAT_MAX_SESSIONS = int(os.getenv("CHAT_MAX_SESSIONS", "1000"))
+
+_buffers = OrderedDict()  # session_id -> deque of the newest chat records
+_summaries = OrderedDict()  # session_id -> {"summary", "through_id"}
+_summarizing = set()
+_background = set()
+
+def new_session_id():
+    """Unguessable key for a new conversation"""
+    return f"chat_{uuid.uuid4().hex}"
+
+def _remember(cache, session_id, value):
+    cache[session_id] = value
+    cache.move_to_end(session_id)
+    while len(cache) > CHAT_MAX_SESSIONS:
+        cache.popitem(last=False)
+
+def _latest_written_id(buffer):
+    return next((turn["id"] for turn in reversed(buffer) if turn.get("id") is not None), None)
+
+def recent_turns(session_id):
+    """The session's newest CHAT_BUFFER_TURNS records, oldest first.
+
+    The ring buffer is reused while its newest written id still matches the
+    store (one indexed MAX lookup; turns still queued have no id and are
+    trusted as this process appended them). Another worker's writes trigger
+    a reload, together with the cached summary it may have advanced.
+    """
+    buffer = _buffers.get(session_id)
+    if buffer is None or _latest_written_id(buffer) != get_latest_chat_id(session_id):
+        buffer = deque(get_chat_history(CHAT_BUFFER_TURNS, session_id), maxlen=CHAT_BUFFER_TURNS)
+        _remember(_buffers, session_id, buffer)
+        _summaries.pop(session_id, None)
+    return list(buffer)
+
+def record_turn(session_id, record):
+    """Append a freshly stored record to the session's buffer.
+
+    A record still queued for writing has no "id" yet; it is the newest turn
+    by construction and gets its id in place once written.
+    """
+    buffer = _buffers.get(session_id)
+    if buffer is not None and not any(turn is record for turn in buffer):
+        buffer.append(record)
+
+def _summary(session_id):
+    summary = _summaries.get(session_id)
+    if summary is None:
+        summary = get_chat_summary(session_id) or {"summary": "", "through_id": 0}
+        _remember(_summaries, session_id, summary)
+    return summary
+
+def build_messages(system_prompt, session_id, user_message):
+    """Chat messages that fit CHAT_CONTEXT_TOKENS: system prompt, running summary,
+    as many recent turns as fit (at most CHAT_WINDOW_TURNS), then the new message"""
+    if not session_id:
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message}
+        ]
+
+    turns = recent_turns(session_id)  # first: a reload also drops a stale summary
+    summary = _summary(session_id)
+    if summary["summary"]:
+        system_prompt += f"\n\nSummary of the earlier conversation: {summary['summary']}"
+
+    budget = CHAT_CONTEXT_TOKENS - text_tokens(system_prompt) - text_tokens(user_message)
+    window = []
+    for turn in reversed(turns[-CHAT_WINDOW_TURNS:]):
+        if turn.get("id") is not None and turn["id"] <= summary["through_id"]:
+            break
+        cost = text_tokens(turn["user_message"]) + text_tokens(turn["ai_response"])
+        if cost > budget:
+            break
+        budget -= cost
+        window.insert(0, turn)
+
+    messages = [{"role": "system", "content": system_prompt}]
+    for turn in window:
+        messages.append({"role": "user", "content": turn["user_message"]})
+        messages.append({"role": "assistant", "content": turn["ai_response"]})
+    messages.append({"role": "user", "content": user_message})
+    return messages
+
+async def refresh_summary(session_id):
+    """Fold turns that have left the context window into the running summary.
+
+    Runs once CHAT_SUMMARY_BATCH turns are waiting, so each chat turn costs
+    at most one small summarization call, off the request path.
+    """
+    if session_id in _summarizing:
+        return
+    _summarizing.add(session_id)
+    try:
+        turns = recent_turns(session_id)
+        summary = _summary(session_id)
+        pending = []
+        for turn in turns[:-CHAT_WINDOW_TURNS]:
+            if turn.get("id") is None:
+                break  # only summarize turns that are written, so through_id is real
+            if turn["id"] > summary["through_id"]:
+                pending.append(turn)
+        if len(pending) < CHAT_SUMMARY_BATCH:
+            return
+
+        transcript = "\n".join(f"User: {t['user_message']}\nCoach: {t['ai_response']}" for t in pending)
+        prompt = f"""Update this running summary of a career coaching conversation with the new turns.
+Keep the user's goals, background, decisions and open questions. At most 120 words.
+
+Current summary:
+{summary['summary'] or '(none)'}
+
+New turns:
+{transcript}"""
+
+        text = await chat_completion([{"role": "user", "content": prompt}], endpoint="chat_summary")
+        updated = {"summary": text.strip(), "through_id": pending[-1]["id"]}
+        save_chat_summary(session_id, updated["summary"], updated["through_id"])
+        _remember(_summaries, session_id, updated)
+    except Exception as e:
+        print(f"⚠️  Chat summary failed for {session_id}: {e}")
+    finally:
+        _summarizing.discard(session_id)
+
+def schedule_summary(session_id):
+    """Run refresh_summary in the background, keeping a reference until it finishes"""
+    if not session_id:
+        return
+    task = asyncio.create_task(refresh_summary(session_id))
+    _background.add(task)
+    task.add_done_callback(_background.discard)
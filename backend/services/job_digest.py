@@ -0,0 +1,184 @@
+import hashlib
+import os
+import re
+from collections import OrderedDict
+from services.ranking_service import normalize_skill
+from services.skill_extractor import skill_matcher
+
+JOB_DIGEST_CACHE_MAX_ENTRIES = int(os.getenv("JOB_DIGEST_CACHE_MAX_ENTRIES", "512"))
+
+MAX_SKILLS = 20
+MAX_RESPONSIBILITIES = 6
+MAX_RESPONSIBILITY_CHARS = 160
+MAX_REQUIREMENTS = 10
+MAX_REQUIREMENT_CHARS = 160
+EXCERPT_CHARS = 600
+
+# Section headings, matched against short lines ("Requirements:", "What you'll do")
+_PREFERRED_HEADING = re.compile(r"\b(preferred|nice to have|bonus|desired|pluses?)\b", re.IGNORECASE)
+_REQUIRED_HEADING = re.compile(r"\b(requirements?|qualifications?|required|must have|what you.ll need|what we.re looking for|skills)\b", re.IGNORECASE)
+_DUTIES_HEADING = re.compile(r"\b(responsibilities|what you.ll do|duties|day to day|you will)\b", re.IGNORECASE)
+_OTHER_HEADING = re.compile(r"\b(benefits|perks|about (us|the company|the role)|compensation|equal opportunity|salary)\b", re.IGNORECASE)
+# Inline markers that make a single requirement optional ("Tableau is a plus")
+_PREFERRED_INLINE = re.compile(r"\b(preferred|nice to have|a plus|bonus|ideally)\b", re.IGNORECASE)
+
+_BULLET = re.compile(r"^\s*(?:[-*•·▪‣◦]|\d+[.)])\s*")
+_SENTENCE_END = re.compile(r"(?<=[.!?;])\s+")
+_YEARS = re.compile(r"\b(\d{1,2})\s*\+?\s*(?:-\s*\d{1,2}\s*)?(?:years?|yrs?)\b", re.IGNORECASE)
+_SENIORITY = [
+    ("Intern", re.compile(r"\b(intern|internship|co-op)\b", re.IGNORECASE)),
+    ("Principal", re.compile(r"\b(principal|staff|distinguished)\b", re.IGNORECASE)),
+    ("Lead", re.compile(r"\b(lead|head of|manager)\b", re.IGNORECASE)),
+    ("Senior", re.compile(r"\b(senior|sr\.?)\b", re.IGNORECASE)),
+    ("Junior", re.compile(r"\b(junior|jr\.?|entry[- ]level|graduate|new grad)\b", re.IGNORECASE)),
+    ("Mid-level", re.compile(r"\b(mid[- ]level|intermediate)\b", re.IGNORECASE)),
+]
+
+_cache = OrderedDict()  # content hash -> digest
+
+def _clean(text, limit):
+    return " ".join(str(text).split())[:limit]
+
+def _lines(description):
+    """(piece, could_be_heading) for each bullet/sentence of a description, bullets stripped.
+
+    Only whole, unbulleted lines can be headings, so "Python preferred." inside
+    a paragraph or a "- Strong SQL skills" bullet is never mistaken for one.
+    """
+    pieces = []
+    for line in description.splitlines():
+        stripped = _BULLET.sub("", line).strip()
+        if not stripped:
+            continue
+        parts = [part for part in _SENTENCE_END.split(stripped) if part]
+        heading_like = stripped == line.strip() and len(parts) == 1
+        pieces.extend((part, heading_like) for part in parts)
+    return pieces
+
+def _heading(line):
+    """Section a short heading-like line opens, or None for ordinary lines"""
+    if len(line) > 60 or (not line.endswith(":") and len(line.split()) > 5):
+        return None
+    for section, pattern in (("other", _OTHER_HEADING), ("preferred", _PREFERRED_HEADING),
+                             ("duties", _DUTIES_HEADING), ("required", _REQUIRED_HEADING)):
+        if pattern.search(line):
+            return section
+    return None
+
+def _seniority(title, description):
+    for text in (title, description):
+        for level, pattern in _SENIORITY:
+            if pattern.search(text or ""):
+                return level
+    return None
+
+def build_job_digest(description, title=""):
+    """Compact, structured requirements of a job posting.
+
+    Skills are matched over the whole description, not a truncated prefix,
+    and split into required and preferred by section headings and inline
+    markers ("... is a plus"). The lines of the requirement sections are kept
+    too, since licenses, certifications and tools outside the skill lexicon
+    ("Current RN license", "BLS/ACLS") only survive there. Responsibilities
+    come from a duties section when there is one; a short excerpt stands in
+    for them otherwise, and for requirement lines cut by the cap that matched
+    no skill.
+    """
+    required, preferred, duties = [], [], []
+    lines = {"required": [], "preferred": []}
+    dropped_unmatched = False
+    section = None
+    for line, heading_like in _lines(description or ""):
+        heading = _heading(line) if heading_like else None
+        if heading:
+            section = heading
+            continue
+        if section == "other":
+            continue
+        optional = section == "preferred" or _PREFERRED_INLINE.search(line)
+        skills = skill_matcher.find(line)
+        for skill in skills:
+            target = preferred if optional else required
+            if skill not in required and skill not in target:
+                target.append(skill)
+        if section in ("required", "preferred"):
+            kept = lines["preferred" if optional else "required"]
+            if len(kept) < MAX_REQUIREMENTS:
+                kept.append(_clean(line, MAX_REQUIREMENT_CHARS))
+            elif not skills:
+                dropped_unmatched = True
+        if section == "duties" and len(duties) < MAX_RESPONSIBILITIES:
+            duties.append(_clean(line, MAX_RESPONSIBILITY_CHARS))
+
+    years = _YEARS.search(description or "")
+    digest = {
+        "required_skills": required[:MAX_SKILLS],
+        "preferred_skills": [s for s in preferred if s not in required][:MAX_SKILLS],
+        "seniority": _seniority(title, description),
+        "years_required": int(years.group(1)) if years else None,
+        "requirements": lines["required"],
+        "preferred_requirements": lines["preferred"],
+        "responsibilities": duties,
+    }
+    if not duties or dropped_unmatched:
+        digest["excerpt"] = _clean(description or "", EXCERPT_CHARS)
+    return digest
+
+def job_digest(description, title=""):
+    """Digest for a job description, parsed once per distinct text and then reused"""
+    key = hashlib.sha256(f"{title}\n{description}".encode("utf-8")).hexdigest()
+    digest = _cache.get(key)
+    if digest is None:
+        digest = build_job_digest(description, title)
+        _cache[key] = digest
+        while len(_cache) > JOB_DIGEST_CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    else:
+        _cache.move_to_end(key)
+    return digest
+
+def render_job_digest(digest):
+    """Prompt text for a job digest; identical for every call about the same posting"""
+    lines = []
+    if digest.get("seniority") or digest.get("years_required") is not None:
+        years = f"{digest['years_required']}+ years" if digest.get("years_required") is not None else ""
+        lines.append(f"Seniority: {', '.join(part for part in (digest.get('seniority'), years) if part)}")
+    if digest["required_skills"]:
+        lines.append(f"Required skills: {', '.join(digest['required_skills'])}")
+    if digest["preferred_skills"]:
+        lines.append(f"Preferred skills: {', '.join(digest['preferred_skills'])}")
+    for key, heading in (("requirements", "Requirements:"), ("preferred_requirements", "Nice to have:")):
+        if digest.get(key):
+            lines.append(heading)
+            lines.extend(f"- {r}" for r in digest[key])
+    if digest["responsibilities"]:
+        lines.append("Responsibilities:")
+        lines.extend(f"- {r}" for r in digest["responsibilities"])
+    if digest.get("excerpt"):
+        lines.append(f"Description excerpt: {digest['excerpt']}")
+    return "\n".join(lines)
+
+def compare_locally(skills, digest):
+    """Skill-overlap comparison in the shape of the LLM's, for when it is unavailable.
+
+    Required skills count fully and preferred ones half; a posting with no
+    recognizable skills scores 0 rather than guessing.
+    """
+    have = {normalize_skill(s) for s in skills}
+    matching = [s for s in digest["required_skills"] + digest["preferred_skills"] if normalize_skill(s) in have]
+    missing = [s for s in digest["required_skills"] + digest["preferred_skills"] if normalize_skill(s) not in have]
+    weights = {s: 1.0 for s in digest["required_skills"]}
+    weights.update({s: 0.5 for s in digest["preferred_skills"]})
+    total = sum(weights.values())
+    fit_score = round(100 * sum(weights[s] for s in matching) / total) if total else 0
+    if missing:
+        recommendation = f"Quick estimate from skill overlap: consider strengthening {', '.join(missing[:3])}."
+    else:
+        recommendation = "Quick estimate from skill overlap: you cover every skill the posting lists."
+    return {
+        "fit_score": fit_score,
+        "missing_skills": missing,
+        "matching_skills": matching,
+        "recommendation": recommendation,
+        "score_source": "local"
+    }
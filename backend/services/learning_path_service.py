@@ -1,3 +1,16 @@
+import csv
+import difflib
+import json
+import os
+from functools import lru_cache
+from itertools import combinations
+from services.ranking_service import normalize_skill
+from services.metrics import span
+
+# Optional external catalog (JSON or CSV) merged over the built-in courses below
+COURSE_CATALOG_FILE = os.getenv("COURSE_CATALOG_FILE", "")
+LEARNING_PATH_CACHE_SIZE = int(os.getenv("LEARNING_PATH_CACHE_SIZE", "1024"))
+
 # Simple course database
 COURSES_DB = {
     "SQL": [
@@ -82,32 +95,159 @@ COURSES_DB = {
     ]
 }
 
-def generate_learning_path(missing_skills):
-    """Generate a learning path for missing skills"""
-    if not missing_skills:
-        return []
-    
+def load_catalog(path):
+    """Load a course catalog file into {skill: [course, ...]}.
+
+    JSON files may use the COURSES_DB shape or be a list of course objects
+    with a "skill" field. CSV files need a "skill" column plus the course
+    fields; both may carry "aliases" (a list, or "|"-separated in CSV).
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(f))
+            for row in rows:
+                row["aliases"] = [a for a in (row.get("aliases") or "").split("|") if a]
+        else:
+            data = json.load(f)
+            if isinstance(data, dict):
+                rows = [{**course, "skill": skill} for skill, courses in data.items() for course in courses]
+            else:
+                rows = data
+
+    catalog = {}
+    for row in rows:
+        skill = row.pop("skill")
+        catalog.setdefault(skill, []).append(_complete_course(skill, row))
+    return catalog
+
+def _complete_course(skill, course):
+    """Fill the fields a learning path step needs that a catalog row left out or blank"""
+    defaults = generic_course(skill)
+    for field, value in defaults.items():
+        if course.get(field) in (None, ""):
+            course[field] = value
+    course["duration_weeks"] = int(course["duration_weeks"])
+    return course
+
+def generic_course(skill):
+    """Recommendation for a skill no catalog course covers"""
+    return {
+        "title": f"Learn {skill}",
+        "provider": "Multiple platforms",
+        "url": f"https://www.google.com/search?q=learn+{skill.replace(' ', '+')}",
+        "duration_weeks": 2,
+        "cost": "Varies",
+        "project": f"Build a portfolio project demonstrating {skill}"
+    }
+
+def _cost_value(cost):
+    """Sortable cost: free first, then by the first dollar amount, unknown last"""
+    text = str(cost or "").lower()
+    if text.startswith("free"):
+        return 0.0
+    digits = "".join(c for c in text.split("/")[0] if c.isdigit() or c == ".")
+    try:
+        return float(digits)
+    except ValueError:
+        return float("inf")
+
+class CourseIndex:
+    """Skill lookup over a course catalog, compiled once.
+
+    Exact lookups go through normalized skill names and aliases. Otherwise the
+    best key is one whose words are all in the query ("Advanced SQL" -> SQL)
+    or that contains all the query's words ("Tableau" -> Tableau Desktop),
+    ranked by word overlap; a prefix-bucketed fuzzy match catches typos.
+    Matching whole words means "R" no longer matches every skill with an "r".
+    """
+
+    MAX_QUERY_WORDS = 6
+
+    def __init__(self, catalog):
+        self.courses = {}  # normalized key -> courses, cheapest/shortest first
+        self.word_sets = {}  # frozenset of words -> normalized key
+        self.tokens = {}  # word -> normalized keys containing it, fewest words first
+        self.prefixes = {}  # first two characters -> normalized keys
+
+        for skill, courses in catalog.items():
+            names = [skill] + [alias for course in courses for alias in course.get("aliases", [])]
+            for name in names:
+                key = normalize_skill(name)
+                if not key:
+                    continue
+                if key not in self.courses:
+                    self.courses[key] = []
+                    self.word_sets.setdefault(frozenset(key.split()), key)
+                    for token in set(key.split()):
+                        self.tokens.setdefault(token, []).append(key)
+                    self.prefixes.setdefault(key[:2], []).append(key)
+                merged = self.courses[key]
+                merged.extend(c for c in courses if c not in merged)
+
+        for courses in self.courses.values():
+            courses.sort(key=lambda c: (_cost_value(c.get("cost")), c.get("duration_weeks", 0)))
+        for keys in self.tokens.values():
+            keys.sort(key=lambda k: len(k.split()))
+
+    def _best_subset(self, query):
+        """Largest key made only of query words; score is its share of the query"""
+        words = sorted(query)
+        for size in range(len(words), 0, -1):
+            for combo in combinations(words, size):
+                key = self.word_sets.get(frozenset(combo))
+                if key:
+                    return key, size / len(words)
+        return None, 0.0
+
+    def _best_superset(self, query):
+        """Smallest key containing every query word; score is the query's share of it"""
+        rarest = min(query, key=lambda token: len(self.tokens.get(token, ())))
+        for key in self.tokens.get(rarest, ()):
+            words = set(key.split())
+            if query <= words:
+                return key, len(query) / len(words)
+        return None, 0.0
+
+    def match(self, skill):
+        """Best course for a skill, or None"""
+        key = normalize_skill(skill)
+        if not key:
+            return None
+        if key in self.courses:
+            return self.courses[key][0]
+
+        query = set(key.split())
+        if len(query) <= self.MAX_QUERY_WORDS:
+            subset, subset_score = self._best_subset(query)
+            superset, superset_score = self._best_superset(query)
+            best = subset if subset_score >= superset_score else superset
+            if best:
+                return self.courses[best][0]
+
+        close = difflib.get_close_matches(key, self.prefixes.get(key[:2], []), n=1, cutoff=0.85)
+        return self.courses[close[0]][0] if close else None
+
+def _build_index():
+    catalog = {skill: list(courses) for skill, courses in COURSES_DB.items()}
+    if COURSE_CATALOG_FILE:
+        for skill, courses in load_catalog(COURSE_CATALOG_FILE).items():
+            catalog.setdefault(skill, []).extend(courses)
+        print(f"✅ Loaded course catalog from {COURSE_CATALOG_FILE}")
+    return CourseIndex(catalog)
+
+course_index = _build_index()
+
+@lru_cache(maxsize=LEARNING_PATH_CACHE_SIZE)
+def _learning_path(skills):
     path = []
     current_week = 0
     
-    for skill in missing_skills[:5]:  # Limit to 5 skills
-        # Find course for this skill (case-insensitive match)
-        course = None
-        for skill_key, courses in COURSES_DB.items():
-            if skill.lower() in skill_key.lower() or skill_key.lower() in skill.lower():
-                course = courses[0]
-                break
+    for skill in skills:
+        course = course_index.match(skill)
         
-        # If no exact match, create generic recommendation
+        # If no match, create generic recommendation
         if not course:
-            course = {
-                "title": f"Learn {skill}",
-                "provider": "Multiple platforms",
-                "url": f"https://www.google.com/search?q=learn+{skill.replace(' ', '+')}",
-                "duration_weeks": 2,
-                "cost": "Varies",
-                "project": f"Build a portfolio project demonstrating {skill}"
-            }
+            course = generic_course(skill)
         
         current_week += course["duration_weeks"]
         
@@ -122,4 +262,13 @@ def generate_learning_path(missing_skills):
             "time_commitment": f"{course['duration_weeks'] * 5} hours"
         })
     
-    return path
\ No newline at end of file
+    return tuple(path)
+
+def generate_learning_path(missing_skills):
+    """Generate a learning path for missing skills"""
+    if not missing_skills:
+        return []
+    
+    # Limit to 5 skills; repeated skill sets are served from the cache
+    with span("learning_path"):
+        return [dict(step) for step in _learning_path(tuple(missing_skills[:5]))]
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", "")  # e.g. ".llm_cache"; empty = memory only
+
+# Per-endpoint TTL in seconds; 0 bypasses the cache. Override with LLM_CACHE_TTL_<ENDPOINT>.
+ENDPOINT_TTLS = {
+    "resume_skills": LLM_CACHE_TTL_SECONDS,
+    "transcript": LLM_CACHE_TTL_SECONDS,
+    "job_compare": LLM_CACHE_TTL_SECONDS,
+    "job_score": LLM_CACHE_TTL_SECONDS,
+    "cover_letter": 0,
+    "chat": 0,
+}
+
+def endpoint_ttl(endpoint):
+    """TTL for an endpoint's responses, or 0 if it should not be cached"""
+    if endpoint is None:
+        return 0
+    override = os.getenv(f"LLM_CACHE_TTL_{endpoint.upper()}")
+    if override is not None:
+        return float(override)
+    return ENDPOINT_TTLS.get(endpoint, 0)
+
+def make_key(model, messages, response_format=None):
+    """Content hash of everything that determines a completion"""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "response_format": response_format},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class LLMCache:
+    """Two-tier response cache: an in-process LRU in front of an optional directory on disk"""
+
+    def __init__(self, max_entries=LLM_CACHE_MAX_ENTRIES, disk_dir=LLM_CACHE_DIR):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self.stats = {}
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _count(self, endpoint, outcome):
+        counters = self.stats.setdefault(endpoint or "default", {"hits": 0, "misses": 0})
+        counters[outcome] += 1
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _read_disk(self, key):
+        try:
+            with open(self._disk_path(key), 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry["expires_at"] <= time.time():
+            return None
+        return entry["expires_at"], entry["value"]
+
+    def _write_disk(self, key, expires_at, value):
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"expires_at": expires_at, "value": value}, f)
+        os.replace(tmp_path, path)
+
+    def get(self, key, endpoint=None):
+        """Return a cached value or None, promoting disk hits into memory"""
+        entry = self._entries.get(key)
+        if entry and entry[0] <= time.time():
+            del self._entries[key]
+            entry = None
+
+        if entry is None and self.disk_dir:
+            entry = self._read_disk(key)
+            if entry:
+                self._store(key, entry)
+
+        if entry is None:
+            self._count(endpoint, "misses")
+            return None
+
+        self._entries.move_to_end(key)
+        self._count(endpoint, "hits")
+        return entry[1]
+
+    def set(self, key, value, ttl):
+        """Cache a value for ttl seconds in memory and, if enabled, on disk"""
+        expires_at = time.time() + ttl
+        self._store(key, (expires_at, value))
+        if self.disk_dir:
+            try:
+                self._write_disk(key, expires_at, value)
+            except OSError as e:
+                print(f"⚠️  LLM cache disk write failed: {e}")
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def snapshot(self):
+        """Entry count and per-endpoint hit/miss counters"""
+        return {"entries": len(self._entries), "disk": bool(self.disk_dir), "endpoints": self.stats}
+
+llm_cache = LLMCache()
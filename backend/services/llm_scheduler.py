@@ -0,0 +1,272 @@
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+from collections import deque
+from services.metrics import span, record_llm_call
+
+# Account-level OpenAI limits this process should stay under
+LLM_RPM_LIMIT = float(os.getenv("LLM_RPM_LIMIT", "500"))
+LLM_TPM_LIMIT = float(os.getenv("LLM_TPM_LIMIT", "200000"))
+# Calls allowed to wait for capacity before new ones are turned away
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "100"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "8"))
+# Completion tokens assumed per call until the response reports real usage
+LLM_COMPLETION_TOKEN_ESTIMATE = int(os.getenv("LLM_COMPLETION_TOKEN_ESTIMATE", "300"))
+
+# Lower runs first: someone is waiting on interactive calls, nobody on bulk ones
+INTERACTIVE, BACKGROUND, BULK = 0, 1, 2
+
+# Wall-clock budget per prompt site, covering queueing, retries and the call
+# itself. Override with LLM_BUDGET_<ENDPOINT>.
+LLM_DEFAULT_BUDGET_SECONDS = float(os.getenv("LLM_DEFAULT_BUDGET_SECONDS", "20"))
+ENDPOINT_BUDGETS = {
+    "chat": 20,
+    "job_compare": 15,
+    "cover_letter": 30,
+    "resume_skills": 20,
+    "transcript": 15,
+    "chat_summary": 30,
+    "job_score": 10,
+}
+
+# A call still running after its endpoint's observed p95 gets one duplicate,
+# if there is spare rate-limit capacity; the first reply wins
+LLM_HEDGE = os.getenv("LLM_HEDGE", "1") == "1"
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "200"))
+
+ENDPOINT_PRIORITIES = {
+    "chat": INTERACTIVE,
+    "job_compare": INTERACTIVE,
+    "cover_letter": INTERACTIVE,
+    "resume_skills": INTERACTIVE,
+    "transcript": INTERACTIVE,
+    "chat_summary": BACKGROUND,
+    "job_score": BULK,
+}
+
+class LLMOverloaded(Exception):
+    """Raised instead of queueing when too many calls are already waiting"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"LLM queue is full, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """Raised when an LLM call cannot finish within its latency budget"""
+
+def endpoint_priority(endpoint):
+    return ENDPOINT_PRIORITIES.get(endpoint, INTERACTIVE)
+
+def endpoint_budget(endpoint):
+    """Seconds an endpoint's LLM call may take end to end"""
+    override = os.getenv(f"LLM_BUDGET_{(endpoint or 'default').upper()}")
+    if override is not None:
+        return float(override)
+    return ENDPOINT_BUDGETS.get(endpoint, LLM_DEFAULT_BUDGET_SECONDS)
+
+def time_left(deadline):
+    """Seconds until a time.monotonic() deadline; raises DeadlineExceeded once it has passed"""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceeded("LLM latency budget exhausted")
+    return remaining
+
+class LatencyTracker:
+    """Recent successful call durations per endpoint, for hedging decisions"""
+
+    def __init__(self, window=LLM_LATENCY_WINDOW):
+        self.window = window
+        self._samples = {}  # endpoint -> deque of seconds
+
+    def record(self, endpoint, seconds):
+        self._samples.setdefault(endpoint, deque(maxlen=self.window)).append(seconds)
+
+    def p95(self, endpoint):
+        """95th percentile of recent calls, or None until there are enough of them"""
+        samples = self._samples.get(endpoint)
+        if not samples or len(samples) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def hedge_delay(self, endpoint):
+        """Seconds to wait before hedging a call, or None to never hedge it"""
+        return self.p95(endpoint) if LLM_HEDGE else None
+
+def text_tokens(text):
+    """Rough token count of a text (~4 characters per token for English)"""
+    return len(text or "") // 4 + 1
+
+def estimate_tokens(messages):
+    """Rough prompt + completion tokens of a call, for rate accounting"""
+    return sum(text_tokens(m.get("content")) for m in messages) + LLM_COMPLETION_TOKEN_ESTIMATE
+
+def is_retryable(error):
+    """Rate limits, server errors and dropped connections are worth another try"""
+    import openai  # already loaded by the time a call has failed
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+def retry_delay(attempt, error=None):
+    """Exponential backoff with full jitter, or the server's Retry-After when it sent one"""
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            return min(LLM_RETRY_MAX_SECONDS, float(response.headers.get("retry-after")))
+        except (TypeError, ValueError):
+            pass
+    return random.uniform(0, min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+
+class TokenBucket:
+    """Refills `rate_per_minute` units per minute, holding at most one minute's worth"""
+
+    def __init__(self, rate_per_minute):
+        self.capacity = max(1.0, rate_per_minute)
+        self.rate = self.capacity / 60
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` can be taken (amounts above capacity wait for a full bucket)"""
+        self._refill()
+        missing = min(amount, self.capacity) - self.tokens
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount):
+        self._refill()
+        self.tokens -= amount
+
+    def give_back(self, amount):
+        """Return overcharged units, or charge extra with a negative amount"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+class LLMScheduler:
+    """Single gate for every OpenAI call in the process.
+
+    Calls wait in a priority queue until both the requests-per-minute and
+    tokens-per-minute buckets have room, failed calls are retried with
+    backoff, and a full queue turns new calls away with LLMOverloaded
+    instead of letting them pile up.
+    """
+
+    def __init__(self, rpm=LLM_RPM_LIMIT, tpm=LLM_TPM_LIMIT, max_queue=LLM_MAX_QUEUE):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_queue = max_queue
+        self._waiting = []  # heap of (priority, arrival, cost, future)
+        self._order = itertools.count()
+        self._timer = None
+
+    def queue_depth(self):
+        return sum(1 for entry in self._waiting if not entry[3].done())
+
+    def check_admission(self):
+        """Raise LLMOverloaded if a new call would only join an already full queue"""
+        depth = self.queue_depth()
+        if depth >= self.max_queue:
+            raise LLMOverloaded(max(1.0, depth / self.requests.rate))
+
+    def _wait_time(self, cost):
+        return max(self.requests.wait_time(1), self.tokens.wait_time(cost))
+
+    def _take(self, cost):
+        self.requests.take(1)
+        self.tokens.take(cost)
+
+    def _dispatch(self):
+        """Release queued calls in priority order while the buckets have room"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._waiting:
+            future, cost = self._waiting[0][3], self._waiting[0][2]
+            if future.done():
+                heapq.heappop(self._waiting)
+                continue
+            wait = self._wait_time(cost)
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            heapq.heappop(self._waiting)
+            self._take(cost)
+            future.set_result(None)
+
+    def try_acquire(self, cost):
+        """Take capacity for one call only if it is free right now and nobody is queued"""
+        if not self._waiting and self._wait_time(cost) == 0:
+            self._take(cost)
+            return True
+        return False
+
+    async def acquire(self, cost, priority=INTERACTIVE):
+        """Wait until one call of `cost` tokens may go out"""
+        if self.try_acquire(cost):
+            return
+        self.check_admission()
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._order), cost, future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Released just as the caller gave up: hand the capacity back
+            if future.done() and not future.cancelled():
+                self.requests.give_back(1)
+                self.tokens.give_back(cost)
+            raise
+
+    def settle(self, estimated, usage):
+        """Correct the token bucket once a response reports what it really used"""
+        if usage is not None and usage.total_tokens:
+            self.tokens.give_back(estimated - usage.total_tokens)
+
+    def refund(self, tokens):
+        """Hand back tokens a call was charged for but never used"""
+        self.tokens.give_back(tokens)
+
+    async def run(self, call, messages, endpoint=None, deadline=None):
+        """Await `call()` within the rate limits, retrying transient failures.
+
+        `call` must start a fresh request each time it is invoked. With a
+        `deadline` (a time.monotonic() value) neither the queue wait nor a
+        retry may run past it; DeadlineExceeded is raised instead.
+        """
+        cost = estimate_tokens(messages)
+        priority = endpoint_priority(endpoint)
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            with span("llm_queue", endpoint or "default"):
+                if deadline is None:
+                    await self.acquire(cost, priority)
+                else:
+                    try:
+                        await asyncio.wait_for(self.acquire(cost, priority), time_left(deadline))
+                    except asyncio.TimeoutError:
+                        raise DeadlineExceeded(f"No LLM capacity for {endpoint or 'default'} within its budget")
+            try:
+                return await call()
+            except Exception as e:
+                if attempt == LLM_MAX_RETRIES or not is_retryable(e):
+                    raise
+                delay = retry_delay(attempt, e)
+                if deadline is not None and delay >= deadline - time.monotonic():
+                    raise
+                record_llm_call(endpoint, "retry")
+                print(f"⚠️  LLM call for {endpoint or 'default'} failed ({type(e).__name__}), retry {attempt + 1} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+scheduler = LLMScheduler()
+latency = LatencyTracker()
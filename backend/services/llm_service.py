@@ -0,0 +1,174 @@
+import asyncio
+import os
+import time
+from services.llm_cache import llm_cache, make_key, endpoint_ttl
+from services.metrics import span, record_llm_call
+from services.task_queue import SingleFlight
+from services.llm_scheduler import (
+    scheduler, latency, estimate_tokens, endpoint_budget, time_left, LLM_COMPLETION_TOKEN_ESTIMATE
+)
+
+DEFAULT_MODEL = "gpt-4o-mini"
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
+
+_async_client = None
+_inflight = SingleFlight()  # identical concurrent prompts share one call
+
+def get_async_client():
+    """Return the shared async OpenAI client, creating it on first use"""
+    global _async_client
+    if _async_client is None:
+        from openai import AsyncOpenAI  # deferred: the SDK is the slowest import in the app
+        # Retries are left to the scheduler so they count against its rate limits
+        _async_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+    return _async_client
+
+async def hedged(attempt, delay, may_hedge):
+    """Await attempt(); if it is still running after `delay` seconds and
+    may_hedge() allows it, start a second copy and return the first success.
+    """
+    tasks = {asyncio.ensure_future(attempt())}
+    try:
+        if delay is not None:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and may_hedge():
+                tasks.add(asyncio.ensure_future(attempt()))
+        while True:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            # Both attempts can finish in the same round; any success wins
+            failed = [task for task in done if task.exception() is not None]
+            for task in done:
+                if task not in failed:
+                    return task.result()
+            if not tasks:
+                return failed[0].result()  # raises: every attempt failed
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def chat_completion(messages, model=DEFAULT_MODEL, response_format=None, timeout=LLM_TIMEOUT_SECONDS, endpoint=None, deadline=None):
+    """Run a chat completion without blocking the event loop and return the reply text.
+
+    `endpoint` names the prompt site; it selects the cache TTL (0 = bypass),
+    the scheduler priority, the latency budget and the bucket for hit/miss
+    counters. Identical prompts already in flight share that call instead
+    of starting another.
+
+    `deadline` (a time.monotonic() value, by default now plus the endpoint's
+    budget) bounds queueing, retries and the call; past it DeadlineExceeded
+    is raised. A call slower than the endpoint's recent p95 is hedged.
+    """
+    if deadline is None:
+        deadline = time.monotonic() + endpoint_budget(endpoint)
+    ttl = endpoint_ttl(endpoint)
+    key = make_key(model, messages, response_format)
+    if ttl > 0:
+        cached = llm_cache.get(key, endpoint)
+        if cached is not None:
+            record_llm_call(endpoint, "cache_hit")
+            return cached
+
+    kwargs = {"model": model, "messages": messages}
+    if response_format:
+        kwargs["response_format"] = response_format
+
+    # Every attempt, hedges included, was charged the estimate; each settles its own
+    async def attempt():
+        start = time.monotonic()
+        try:
+            response = await asyncio.wait_for(
+                get_async_client().chat.completions.create(**kwargs),
+                timeout=min(timeout, time_left(deadline))
+            )
+        except asyncio.CancelledError:
+            # Lost a hedge race or the caller left: no completion was generated
+            scheduler.refund(LLM_COMPLETION_TOKEN_ESTIMATE)
+            raise
+        latency.record(endpoint, time.monotonic() - start)
+        scheduler.settle(estimate_tokens(messages), response.usage)
+        return response
+
+    def may_hedge():
+        # A hedge is an extra request: only send it with spare capacity
+        if not scheduler.try_acquire(estimate_tokens(messages)):
+            return False
+        record_llm_call(endpoint, "hedge")
+        return True
+
+    async def call():
+        return await hedged(attempt, latency.hedge_delay(endpoint), may_hedge)
+
+    async def complete():
+        with span("llm", endpoint or "default"):
+            try:
+                response = await scheduler.run(call, messages, endpoint, deadline)
+            except BaseException:
+                record_llm_call(endpoint, "error")
+                raise
+        record_llm_call(endpoint, "ok", response.usage)
+        content = response.choices[0].message.content
+
+        if ttl > 0 and content:
+            llm_cache.set(key, content, ttl)
+        return content
+
+    return await _inflight.run(key, complete)
+
+async def stream_chat_completion(messages, model=DEFAULT_MODEL, timeout=LLM_TIMEOUT_SECONDS, endpoint=None, deadline=None):
+    """Yield reply text deltas as OpenAI streams them.
+
+    `timeout` bounds the wait for the stream to open and for each next chunk,
+    so a stalled stream fails instead of hanging the response. `deadline`
+    (default: the endpoint's budget) bounds getting the stream open.
+    """
+    if deadline is None:
+        deadline = time.monotonic() + endpoint_budget(endpoint)
+
+    async def open_stream():
+        return await asyncio.wait_for(
+            get_async_client().chat.completions.create(
+                model=model,
+                messages=messages,
+                stream=True,
+                stream_options={"include_usage": True}
+            ),
+            timeout=min(timeout, time_left(deadline))
+        )
+
+    with span("llm", endpoint or "default"):
+        try:
+            stream = await scheduler.run(open_stream, messages, endpoint, deadline)
+            usage = None
+            try:
+                chunks = stream.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=timeout)
+                    except StopAsyncIteration:
+                        break
+                    if chunk.usage:
+                        usage = chunk.usage
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                # Release the upstream connection even when the client went away mid-stream
+                await stream.close()
+        except BaseException:
+            record_llm_call(endpoint, "error")
+            raise
+    record_llm_call(endpoint, "ok", usage)
+    scheduler.settle(estimate_tokens(messages), usage)
+
+async def map_bounded(func, items, limit):
+    """Run func over items with at most `limit` calls in flight.
+
+    Results come back in input order; a failed call yields its exception
+    instead of cancelling the rest, so callers can keep partial results.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(item):
+        async with semaphore:
+            return await func(item)
+
+    return await asyncio.gather(*(run(item) for item in items), return_exceptions=True)
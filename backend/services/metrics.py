@@ -0,0 +1,78 @@
+import asyncio
+import json
+import os
+import time
+from contextlib import contextmanager
+from prometheus_client import Counter, Histogram, CONTENT_TYPE_LATEST, generate_latest
+
+# Print one JSON line per finished span (stage, endpoint, duration)
+METRICS_LOG_SPANS = os.getenv("METRICS_LOG_SPANS", "") == "1"
+EVENT_LOOP_PROBE_SECONDS = float(os.getenv("EVENT_LOOP_PROBE_SECONDS", "0.5"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+REQUEST_SECONDS = Histogram(
+    "career_copilot_request_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+STAGE_SECONDS = Histogram(
+    "career_copilot_stage_seconds",
+    "Latency of one processing stage (pdf_parse, llm, llm_queue, adzuna_fetch, db, learning_path)",
+    ["stage", "operation"],
+    buckets=LATENCY_BUCKETS
+)
+LLM_TOKENS = Counter(
+    "career_copilot_llm_tokens_total",
+    "OpenAI tokens used, by prompt site",
+    ["endpoint", "kind"]
+)
+LLM_CALLS = Counter(
+    "career_copilot_llm_calls_total",
+    "LLM calls by prompt site and outcome (ok, error, retry, hedge, fallback, cache_hit)",
+    ["endpoint", "outcome"]
+)
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "career_copilot_event_loop_lag_seconds",
+    "How late the event loop woke a periodic probe; high values mean something blocked it",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+
+@contextmanager
+def span(stage, operation=""):
+    """Time a block as one stage; works around awaits too.
+
+    `operation` narrows the stage, e.g. the prompt site for "llm" or the
+    function for "db".
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage=stage, operation=operation).observe(duration)
+        if METRICS_LOG_SPANS:
+            print(json.dumps({"span": stage, "operation": operation, "ms": round(duration * 1000, 2)}))
+
+def record_llm_call(endpoint, outcome, usage=None):
+    """Count an LLM call and, when the response carried usage, its tokens"""
+    endpoint = endpoint or "default"
+    LLM_CALLS.labels(endpoint=endpoint, outcome=outcome).inc()
+    if usage is not None:
+        LLM_TOKENS.labels(endpoint=endpoint, kind="prompt").inc(usage.prompt_tokens or 0)
+        LLM_TOKENS.labels(endpoint=endpoint, kind="completion").inc(usage.completion_tokens or 0)
+
+def observe_request(method, route, status, duration):
+    REQUEST_SECONDS.labels(method=method, route=route, status=str(status)).observe(duration)
+
+async def probe_event_loop():
+    """Runs forever, recording how late each sleep wakes up"""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(EVENT_LOOP_PROBE_SECONDS)
+        EVENT_LOOP_LAG_SECONDS.observe(max(0.0, time.perf_counter() - start - EVENT_LOOP_PROBE_SECONDS))
+
+def render():
+    """Prometheus text exposition of every metric, with its content type"""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import importlib
+import os
+import signal
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from services.metrics import span
+from services import request_profiler
+
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(10 * 1024 * 1024)))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "30"))
+PDF_MAX_CHARS = int(os.getenv("PDF_MAX_CHARS", "10000"))
+PDF_TIMEOUT_SECONDS = float(os.getenv("PDF_TIMEOUT_SECONDS", "15"))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Where uploads are spooled while they are parsed; empty = the system temp dir
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR", "") or None
+UPLOAD_CHUNK_BYTES = 64 * 1024
+
+class PdfTooLargeError(ValueError):
+    """The document exceeds PDF_MAX_BYTES"""
+
+class PdfUnreadableError(ValueError):
+    """PyMuPDF could not open the upload as a PDF"""
+
+_pool = None
+
+def _init_worker():
+    """Undo the server's signal handlers, which forked workers inherit.
+
+    Otherwise SIGTERM only sets the server's exit flag in the worker, so
+    _reset_pool could never stop a stuck worker and shutdown left them running.
+    Ctrl+C reaches the whole process group; the server handles it for them.
+    """
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, initializer=_init_worker)
+    return _pool
+
+def _reset_pool(pool):
+    """Kill a pool's workers (e.g. one stuck on a hostile PDF); the next call starts a fresh pool"""
+    global _pool
+    if _pool is pool:
+        _pool = None
+    for process in list(getattr(pool, "_processes", {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_pool():
+    """Stop the worker processes; called on app shutdown.
+
+    Workers are terminated rather than asked to exit, so none can be left
+    behind (still holding the server's stdout) if the process exits first.
+    """
+    if _pool is not None:
+        _reset_pool(_pool)
+
+def spool_upload(source, max_bytes=PDF_MAX_BYTES):
+    """Copy an uploaded file object to a temp file in fixed-size chunks, hashing as it goes.
+
+    Never holds more than one chunk in memory and stops as soon as the upload
+    passes max_bytes. Returns (path, size, sha256); the caller deletes the file.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=".pdf", dir=UPLOAD_SPOOL_DIR)
+    try:
+        with os.fdopen(fd, "wb") as spool:
+            while True:
+                chunk = source.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise PdfTooLargeError(f"PDF is larger than {max_bytes // (1024 * 1024)} MB")
+                digest.update(chunk)
+                spool.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path, size, digest.hexdigest()
+
+def remove_spool(path):
+    """Delete a spooled upload, ignoring one that is already gone"""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+def extract_text(pdf_path, max_pages=PDF_MAX_PAGES, max_chars=PDF_MAX_CHARS):
+    """Extract text from a PDF file, stopping at max_pages or once max_chars are collected.
+
+    Runs inside a worker process, so it imports PyMuPDF itself. Opening by
+    path lets PyMuPDF read pages from the file on demand instead of from a
+    copy of the whole document in memory.
+    """
+    import fitz  # PyMuPDF
+
+    try:
+        doc = fitz.open(pdf_path, filetype="pdf")
+    except Exception:
+        # Raised as our own type: PyMuPDF's errors name the spool path, and
+        # unpickling them would import PyMuPDF into the server process
+        raise PdfUnreadableError("File is not a readable PDF") from None
+
+    parts = []
+    collected = 0
+    with doc:
+        for page_number, page in enumerate(doc):
+            if page_number >= max_pages or collected >= max_chars:
+                break
+            text = page.get_text()
+            parts.append(text)
+            collected += len(text)
+    return "".join(parts)[:max_chars]
+
+def _extract_text_profiled(pdf_path):
+    """extract_text under cProfile; returns (text, raw stats) for the request's profile"""
+    import cProfile
+    profiler = cProfile.Profile()
+    text = profiler.runcall(extract_text, pdf_path)
+    profiler.create_stats()
+    return text, profiler.stats
+
+def _load_pymupdf():
+    importlib.import_module("fitz")
+    return True
+
+async def warm_pool():
+    """Start the worker processes and import PyMuPDF in each of them ahead of the first upload"""
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+    await asyncio.gather(*(loop.run_in_executor(pool, _load_pymupdf) for _ in range(PDF_WORKERS)))
+
+async def extract_pdf_text(pdf_path):
+    """Extract resume text from a spooled PDF in the process pool with a per-document timeout.
+
+    Raises PdfTooLargeError above PDF_MAX_BYTES and asyncio.TimeoutError when
+    a document takes longer than PDF_TIMEOUT_SECONDS.
+    """
+    if os.path.getsize(pdf_path) > PDF_MAX_BYTES:
+        raise PdfTooLargeError(f"PDF is larger than {PDF_MAX_BYTES // (1024 * 1024)} MB")
+
+    loop = asyncio.get_running_loop()
+    for attempt in range(2):
+        pool = _get_pool()
+        try:
+            with span("pdf_parse"):
+                if request_profiler.active():
+                    # The parse runs in another process: profile it there
+                    text, stats = await asyncio.wait_for(
+                        loop.run_in_executor(pool, _extract_text_profiled, pdf_path),
+                        timeout=PDF_TIMEOUT_SECONDS
+                    )
+                    request_profiler.add_child_stats(stats)
+                    return text
+                return await asyncio.wait_for(
+                    loop.run_in_executor(pool, extract_text, pdf_path),
+                    timeout=PDF_TIMEOUT_SECONDS
+                )
+        except asyncio.TimeoutError:
+            _reset_pool(pool)
+            raise
+        except BrokenProcessPool:
+            # Another request's timeout recycled the pool under us; retry once
+            _reset_pool(pool)
+            if attempt:
+                raise
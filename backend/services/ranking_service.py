@@ -0,0 +1,104 @@
+import math
+import re
+
+# Common spellings folded onto one canonical skill name
+SKILL_ALIASES = {
+    "js": "javascript",
+    "ts": "typescript",
+    "py": "python",
+    "ml": "machine learning",
+    "ai": "artificial intelligence",
+    "nlp": "natural language processing",
+    "k8s": "kubernetes",
+    "postgres": "postgresql",
+    "golang": "go",
+    "reactjs": "react",
+    "react.js": "react",
+    "nodejs": "node.js",
+    "node": "node.js",
+    "ms excel": "excel",
+    "powerbi": "power bi",
+    "stats": "statistics",
+}
+
+MAX_PHRASE_WORDS = 3
+TITLE_WEIGHT = 2
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+def tokenize(text):
+    """Lowercase text and split it into skill-friendly tokens (keeps c++, c#, node.js)"""
+    return [token.rstrip(".") for token in _TOKEN_RE.findall((text or "").lower())]
+
+def token_spans(text):
+    """(token, start, end) for each token of `text`, with the same rules as tokenize"""
+    spans = []
+    for match in _TOKEN_RE.finditer((text or "").lower()):
+        token = match.group().rstrip(".")
+        spans.append((token, match.start(), match.start() + len(token)))
+    return spans
+
+def normalize_skill(skill):
+    """Map a skill name onto its canonical, tokenized form"""
+    phrase = " ".join(tokenize(skill))
+    return SKILL_ALIASES.get(phrase, phrase)
+
+def _job_terms(job):
+    """Count every 1..MAX_PHRASE_WORDS-gram of a job's title and description"""
+    counts = {}
+    title_tokens = tokenize(job.get("title"))
+    description_tokens = tokenize(job.get("description"))
+
+    for tokens, weight in ((title_tokens, TITLE_WEIGHT), (description_tokens, 1)):
+        for n in range(1, MAX_PHRASE_WORDS + 1):
+            for i in range(len(tokens) - n + 1):
+                term = " ".join(tokens[i:i + n])
+                term = SKILL_ALIASES.get(term, term)
+                counts[term] = counts.get(term, 0) + weight
+    return counts
+
+def rank_jobs(skills, jobs):
+    """Score every job against the resume skills in one vectorized pass.
+
+    Jobs become sparse TF-IDF vectors over their n-grams, the resume becomes
+    an IDF-weighted vector over its normalized skills, and the cosine between
+    them is mapped onto a 0-100 scale. Returns one score per job, in order.
+    """
+    if not jobs:
+        return []
+
+    query_terms = sorted({normalize_skill(s) for s in skills if normalize_skill(s)})
+    if not query_terms:
+        return [0] * len(jobs)
+
+    import numpy as np  # deferred: only job search needs it, and it is slow to import
+
+    job_terms = [_job_terms(job) for job in jobs]
+    n_jobs = len(jobs)
+
+    # Document frequency over every term seen, so job norms cover the full vector
+    df = {}
+    for counts in job_terms:
+        for term in counts:
+            df[term] = df.get(term, 0) + 1
+
+    def idf(term):
+        return math.log((1 + n_jobs) / (1 + df.get(term, 0))) + 1
+
+    # Only the resume's columns are materialized; the rest only feed the norms
+    column = {term: j for j, term in enumerate(query_terms)}
+    matrix = np.zeros((n_jobs, len(query_terms)))
+    norms = np.zeros(n_jobs)
+    for i, counts in enumerate(job_terms):
+        weights = {term: (1 + math.log(tf)) * idf(term) for term, tf in counts.items()}
+        norms[i] = math.sqrt(sum(w * w for w in weights.values()))
+        for term, j in column.items():
+            if term in weights:
+                matrix[i, j] = weights[term]
+
+    query = np.array([idf(term) for term in query_terms])
+    denominator = norms * np.linalg.norm(query)
+    cosine = np.divide(matrix @ query, denominator, out=np.zeros(n_jobs), where=denominator > 0)
+
+    # Raw cosines cluster near zero for short postings; sqrt spreads them out
+    return [int(round(score)) for score in np.clip(100 * np.sqrt(cosine), 0, 100)]
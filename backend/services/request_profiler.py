@@ -0,0 +1,133 @@
+import contextvars
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+# Profiling is off unless one of these is set. With PROFILE_TOKEN, a request
+# carrying it in the X-Profile header or ?profile= query parameter is
+# profiled (and the profile endpoints accept it); PROFILE_SAMPLE_RATE
+# profiles that fraction of all requests.
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "") or os.path.join(tempfile.gettempdir(), "career_copilot_profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_HEADER = "x-profile"
+
+ENABLED = bool(PROFILE_TOKEN) or PROFILE_SAMPLE_RATE > 0
+
+_PROFILE_ID_RE = re.compile(r"^\d{8}-\d{6}-[0-9a-f]{8}$")
+_current = contextvars.ContextVar("request_profile", default=None)
+# cProfile hooks the whole thread, so only one request is profiled at a time
+_busy = threading.Lock()
+
+class _ChildStats:
+    """Stats collected in another process, in the form pstats.Stats.add expects"""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+def token_matches(value):
+    return bool(PROFILE_TOKEN) and hmac.compare_digest(value or "", PROFILE_TOKEN)
+
+def profile_reason(request):
+    """"requested", "sampled" or None for a request that should not be profiled"""
+    if request.url.path.startswith("/api/profiles"):
+        return None  # reading profiles must not rotate them out
+    if token_matches(request.headers.get(PROFILE_HEADER)) or token_matches(request.query_params.get("profile")):
+        return "requested"
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        return "sampled"
+    return None
+
+def active():
+    """True while the current request is being profiled"""
+    return _current.get() is not None
+
+def add_child_stats(stats):
+    """Merge stats profiled in a worker process into the current request's profile"""
+    children = _current.get()
+    if children is not None and stats:
+        children.append(_ChildStats(stats))
+
+def start():
+    """Begin profiling this request; returns None if another profile is already running"""
+    if sys.getprofile() is not None or not _busy.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    token = _current.set([])
+    profiler.enable()
+    return profiler, token
+
+def stop(handle):
+    """Stop profiling; returns pstats.Stats including any worker-process stats"""
+    profiler, token = handle
+    profiler.disable()
+    children = _current.get()
+    _current.reset(token)
+    _busy.release()
+    stats = pstats.Stats(profiler)
+    for child in children:
+        stats.add(child)
+    return stats
+
+def _path(profile_id, extension):
+    return os.path.join(PROFILE_DIR, f"{profile_id}.{extension}")
+
+def save(stats, info):
+    """Write a profile and its metadata to PROFILE_DIR, keeping the newest PROFILE_KEEP"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stats.dump_stats(_path(info["id"], "prof"))
+    with open(_path(info["id"], "json"), "w") as f:
+        json.dump(info, f)
+
+    for stale in list_profiles()[PROFILE_KEEP:]:
+        for extension in ("prof", "json"):
+            try:
+                os.remove(_path(stale["id"], extension))
+            except FileNotFoundError:
+                pass
+
+def new_profile_id():
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+def list_profiles():
+    """Metadata of the stored profiles, newest first"""
+    try:
+        names = os.listdir(PROFILE_DIR)
+    except FileNotFoundError:
+        return []
+    profiles = []
+    for name in names:
+        if name.endswith(".json"):
+            try:
+                with open(os.path.join(PROFILE_DIR, name)) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    return sorted(profiles, key=lambda p: p["id"], reverse=True)
+
+def profile_path(profile_id):
+    """Path of a stored .prof file, or None for unknown or malformed ids"""
+    if not _PROFILE_ID_RE.match(profile_id or ""):
+        return None
+    path = _path(profile_id, "prof")
+    return path if os.path.exists(path) else None
+
+def render_text(path, limit=40):
+    """Top functions of a stored profile by cumulative time, as pstats prints them"""
+    out = io.StringIO()
+    pstats.Stats(path, stream=out).sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
@@ -0,0 +1,63 @@
+import re
+from services.ranking_service import normalize_skill
+
+MAX_SKILLS = 25
+MAX_ROLES = 5
+MAX_ACHIEVEMENTS = 5
+MAX_ACHIEVEMENT_CHARS = 160
+EXCERPT_CHARS = 800
+
+def _clean(text, limit):
+    return " ".join(str(text).split())[:limit]
+
+def dedupe_skills(skills):
+    """Skills with aliases and case variants collapsed, first spelling kept"""
+    seen = set()
+    unique = []
+    for skill in skills:
+        key = normalize_skill(skill)
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(_clean(skill, 40))
+    return unique
+
+def _years(value):
+    if isinstance(value, (int, float)):
+        return value
+    match = re.search(r"\d+(\.\d+)?", str(value or ""))
+    return float(match.group()) if match else None
+
+def build_digest(extracted, resume_text):
+    """Compact, structured profile of a resume from the upload-time extraction.
+
+    `extracted` is the parsed LLM reply (skills, roles, achievements,
+    years_experience); missing fields fall back to a short excerpt of the
+    whitespace-normalized text so older resumes still get a usable digest.
+    """
+    digest = {
+        "skills": dedupe_skills(extracted.get("skills", []))[:MAX_SKILLS],
+        "roles": [_clean(r, 80) for r in extracted.get("roles", []) if r][:MAX_ROLES],
+        "achievements": [_clean(a, MAX_ACHIEVEMENT_CHARS) for a in extracted.get("achievements", []) if a][:MAX_ACHIEVEMENTS],
+        "years_experience": _years(extracted.get("years_experience")),
+    }
+    if not digest["achievements"]:
+        digest["excerpt"] = _clean(resume_text, EXCERPT_CHARS)
+    return digest
+
+def digest_for(resume):
+    """The stored digest, or one derived on the fly for resumes uploaded before digests existed"""
+    return resume.get("digest") or build_digest({"skills": resume.get("skills", [])}, resume.get("text", ""))
+
+def render_digest(digest):
+    """Prompt text for a digest; identical for every call about the same resume"""
+    lines = [f"Skills: {', '.join(digest['skills'])}"]
+    if digest.get("roles"):
+        lines.append(f"Roles: {'; '.join(digest['roles'])}")
+    if digest.get("years_experience") is not None:
+        lines.append(f"Years of experience: {digest['years_experience']:g}")
+    if digest.get("achievements"):
+        lines.append("Achievements:")
+        lines.extend(f"- {a}" for a in digest["achievements"])
+    if digest.get("excerpt"):
+        lines.append(f"Resume excerpt: {digest['excerpt']}")
+    return "\n".join(lines)
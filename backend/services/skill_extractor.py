@@ -0,0 +1,223 @@
+import os
+import re
+from services.ranking_service import SKILL_ALIASES, normalize_skill, token_spans
+from services.learning_path_service import COURSES_DB, course_index
+
+# "auto" = local first, LLM when local results look thin; "local" or "llm" to force one
+SKILL_EXTRACTION_MODE = os.getenv("SKILL_EXTRACTION_MODE", "auto")
+# Local results are trusted once they find at least this much
+RESUME_LOCAL_MIN_SKILLS = int(os.getenv("RESUME_LOCAL_MIN_SKILLS", "8"))
+TRANSCRIPT_LOCAL_MIN_COURSES = int(os.getenv("TRANSCRIPT_LOCAL_MIN_COURSES", "3"))
+
+SKILL_LEXICON = [
+    # Languages
+    "Python", "SQL", "R", "Java", "JavaScript", "TypeScript", "C", "C++", "C#", "Go", "Rust", "Scala",
+    "Kotlin", "Swift", "Ruby", "PHP", "MATLAB", "SAS", "Bash", "HTML", "CSS",
+    # Data and analytics
+    "Excel", "Tableau", "Power BI", "Looker", "Statistics", "Data Analysis", "Data Visualization",
+    "Data Modeling", "Data Engineering", "ETL", "A/B Testing", "Pandas", "NumPy", "SciPy", "Jupyter",
+    "dbt", "Airflow", "Spark", "Hadoop", "Kafka", "Snowflake", "BigQuery", "Redshift", "Databricks",
+    "Google Analytics", "Regression", "Forecasting", "Econometrics",
+    # Machine learning
+    "Machine Learning", "Deep Learning", "Natural Language Processing", "Computer Vision",
+    "Artificial Intelligence", "scikit-learn", "TensorFlow", "PyTorch", "Keras", "XGBoost", "LLM",
+    "MLOps", "Feature Engineering",
+    # Databases
+    "PostgreSQL", "MySQL", "SQLite", "MongoDB", "Redis", "Elasticsearch", "DynamoDB", "Oracle",
+    # Web and backend
+    "React", "Angular", "Vue", "Node.js", "Express", "Django", "Flask", "FastAPI", "Spring",
+    "REST APIs", "GraphQL", "Microservices",
+    # Cloud and DevOps
+    "AWS", "Azure", "Google Cloud", "Docker", "Kubernetes", "Terraform", "CI/CD", "Git", "GitHub",
+    "Linux", "Jenkins",
+    # Practices and tools
+    "Agile", "Scrum", "Jira", "Project Management", "Product Management", "Figma", "SEO",
+    "Salesforce", "SAP", "Financial Modeling", "Accounting",
+    # Professional
+    "Communication", "Leadership", "Teamwork", "Problem Solving", "Public Speaking", "Mentoring",
+    "Stakeholder Management", "Presentation",
+]
+
+COURSE_LEXICON = [
+    "Data Structures", "Algorithms", "Data Structures and Algorithms", "Databases", "Database Systems",
+    "Operating Systems", "Computer Networks", "Computer Architecture", "Software Engineering",
+    "Discrete Mathematics", "Linear Algebra", "Calculus", "Multivariable Calculus",
+    "Differential Equations", "Probability", "Statistics", "Mathematical Statistics",
+    "Applied Statistics", "Statistical Inference", "Regression Analysis", "Time Series Analysis",
+    "Machine Learning", "Deep Learning", "Artificial Intelligence", "Natural Language Processing",
+    "Computer Vision", "Data Mining", "Data Science", "Data Visualization", "Big Data",
+    "Distributed Systems", "Cloud Computing", "Computer Security", "Cryptography",
+    "Web Development", "Mobile Development", "Human-Computer Interaction", "Programming Languages",
+    "Compilers", "Theory of Computation", "Object-Oriented Programming", "Numerical Methods",
+    "Optimization", "Operations Research", "Econometrics", "Microeconomics", "Macroeconomics",
+    "Financial Accounting", "Managerial Accounting", "Corporate Finance", "Marketing",
+    "Business Analytics", "Information Systems", "Technical Writing", "Research Methods",
+]
+
+HONORS_LEXICON = [
+    "Dean's List", "President's List", "Summa Cum Laude", "Magna Cum Laude", "Cum Laude",
+    "Honors Program", "Phi Beta Kappa", "Merit Scholarship",
+]
+
+# Everyday words that only count as skills when written exactly like this
+# ("experience with Spark pipelines", but not "spark"). The ones that also
+# start ordinary sentences ("Go to market", "Excel at ...") don't count there,
+# where anything is capitalized, unless they are a whole list item. Single
+# letters are too ambiguous even capitalized and only count as an item of a
+# list ("Skills: Python, R, SQL" but not "R&D" or "Vitamin C research").
+# None of these count towards confidence.
+CASE_SENSITIVE = {"Go", "Excel", "Swift", "Rust", "Spark", "Express", "Spring", "Oracle", "Vue"}
+SENTENCE_WORDS = {"Go", "Excel", "Swift", "Express", "Spring"}
+LIST_ONLY = {"R", "C"}
+# Words right before a skill that make it mean something else ("report to
+# leadership" is about people, "strong leadership" is a skill)
+_NOT_AFTER = {
+    "Leadership": {"to", "from", "with", "for", "the", "our", "your", "senior", "executive", "company"},
+}
+
+_LIST_DELIMITERS = set("\n,;:()[]|/•·")
+_GPA_RE = re.compile(r"\b(?:cumulative\s+|overall\s+)?gpa\b[^0-9\n]{0,20}([0-4]\.\d{1,2})", re.IGNORECASE)
+_YEARS_RE = re.compile(r"\b(\d{1,2})\+?\s*(?:years?|yrs?)\b(?:\s+of)?(?:\s+\w+)?\s+experience", re.IGNORECASE)
+
+class PhraseMatcher:
+    """Aho-Corasick automaton over token sequences.
+
+    Patterns and text go through the same tokenizer as ranking, so matches
+    always fall on word boundaries, and one pass over the text finds every
+    pattern regardless of how many there are.
+    """
+
+    def __init__(self, phrases):
+        # phrases: display name -> list of surface forms
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]  # node -> [(display, length in tokens, surface)]
+        for display, surfaces in phrases.items():
+            for surface in surfaces:
+                tokens = [token for token, _, _ in token_spans(surface)]
+                if tokens:
+                    self._add(tokens, (display, len(tokens), surface))
+        self._link()
+
+    def _add(self, tokens, entry):
+        node = 0
+        for token in tokens:
+            if token not in self.goto[node]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[node][token] = len(self.goto) - 1
+            node = self.goto[node][token]
+        self.output[node].append(entry)
+
+    def _link(self):
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for token, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and token not in self.goto[state]:
+                    state = self.fail[state]
+                self.fail[child] = self.goto[state].get(token, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find(self, text):
+        """Display names found in text, in order of first appearance.
+
+        Overlapping matches resolve to the leftmost, then longest, so
+        "Magna Cum Laude" does not also count as "Cum Laude".
+        """
+        spans = token_spans(text)
+        matches = []
+        node = 0
+        for i, (token, _, end) in enumerate(spans):
+            while node and token not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(token, 0)
+            for display, length, surface in self.output[node]:
+                first = i - length + 1
+                start = spans[first][1]
+                if surface in LIST_ONLY and not _standalone(text, start, end, surface):
+                    continue
+                if surface in CASE_SENSITIVE and not (_standalone(text, start, end, surface)
+                                                      or _in_prose(text, start, end, surface)):
+                    continue
+                if first and spans[first - 1][0] in _NOT_AFTER.get(display, ()):
+                    continue
+                matches.append((first, -length, display))
+
+        found = []
+        covered_until = 0
+        for first, negative_length, display in sorted(matches):
+            if first < covered_until:
+                continue
+            covered_until = first - negative_length
+            if display not in found:
+                found.append(display)
+        return found
+
+def _standalone(text, start, end, surface):
+    """True if text[start:end] is exactly `surface` and a whole list item:
+    the nearest non-blank characters on both sides are list delimiters or
+    the ends of the text"""
+    if text[start:end] != surface:
+        return False
+    before = text[:start].rstrip(" \t")
+    after = text[end:].lstrip(" \t")
+    if after.startswith(".") and (len(after) == 1 or after[1].isspace()):
+        after = after[1:].lstrip(" \t")  # list item ending a sentence
+    return (not before or before[-1] in _LIST_DELIMITERS) and (not after or after[0] in _LIST_DELIMITERS)
+
+def _in_prose(text, start, end, surface):
+    """True if text[start:end] is exactly `surface`, and not the first word of
+    a sentence for words that often start one"""
+    if text[start:end] != surface:
+        return False
+    if surface not in SENTENCE_WORDS:
+        return True
+    before = text[:start].rstrip()
+    return bool(before) and before[-1] not in ".!?" and "\n" not in text[len(before):start]
+
+def _skill_phrases():
+    """Curated skills plus every catalog skill, each with its known aliases"""
+    display = {}
+    for name in SKILL_LEXICON + list(COURSES_DB):
+        display.setdefault(normalize_skill(name), name)
+    for key in course_index.courses:
+        display.setdefault(key, key.title())
+
+    phrases = {name: [name] for name in display.values()}
+    for alias, canonical in SKILL_ALIASES.items():
+        if canonical in display:
+            phrases[display[canonical]].append(alias)
+    return phrases
+
+skill_matcher = PhraseMatcher(_skill_phrases())
+course_matcher = PhraseMatcher({name: [name] for name in COURSE_LEXICON})
+honors_matcher = PhraseMatcher({name: [name] for name in HONORS_LEXICON})
+
+def extract_resume_profile(text):
+    """Skills (and years of experience, when stated) found locally in resume text.
+
+    Returns (extracted, confident): `extracted` has the shape of the LLM
+    extraction reply; `confident` says whether it is good enough on its own.
+    """
+    skills = skill_matcher.find(text)
+    years = _YEARS_RE.search(text)
+    extracted = {"skills": skills, "years_experience": int(years.group(1)) if years else None}
+    unambiguous = [s for s in skills if s not in CASE_SENSITIVE and s not in LIST_ONLY]
+    return extracted, len(unambiguous) >= RESUME_LOCAL_MIN_SKILLS
+
+def extract_transcript(text):
+    """GPA, relevant courses and honors found locally in transcript text.
+
+    Returns (data, confident) like extract_resume_profile; confident needs a
+    GPA and at least TRANSCRIPT_LOCAL_MIN_COURSES recognized courses.
+    """
+    gpa = _GPA_RE.search(text)
+    data = {
+        "gpa": float(gpa.group(1)) if gpa else None,
+        "relevant_courses": course_matcher.find(text),
+        "honors": honors_matcher.find(text)
+    }
+    return data, gpa is not None and len(data["relevant_courses"]) >= TRANSCRIPT_LOCAL_MIN_COURSES
@@ -0,0 +1,61 @@
+import builtins
+import os
+import sys
+import time
+
+# Break import time down by top-level package and print it once the app is up
+STARTUP_REPORT = os.getenv("STARTUP_REPORT", "") == "1"
+STARTUP_REPORT_TOP = int(os.getenv("STARTUP_REPORT_TOP", "10"))
+
+_began = time.perf_counter()
+_costs = {}  # top-level package -> seconds spent importing its own modules
+_stack = []  # time spent in nested imports, per import in progress
+_original_import = None
+
+def process_age():
+    """Seconds since the OS started this process, or None where /proc is unavailable"""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    start = time.perf_counter()
+    _stack.append(0.0)
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - start
+        nested = _stack.pop()
+        package = name.partition(".")[0]
+        _costs[package] = _costs.get(package, 0.0) + elapsed - nested
+        if _stack:
+            _stack[-1] += elapsed
+
+def begin():
+    """Start timing first-time imports (only with STARTUP_REPORT=1)"""
+    global _began, _original_import
+    _began = time.perf_counter()
+    if STARTUP_REPORT and _original_import is None:
+        _original_import = builtins.__import__
+        builtins.__import__ = _timed_import
+
+def report():
+    """Stop timing imports and print how long startup took and where it went"""
+    global _original_import
+    if _original_import is not None:
+        builtins.__import__ = _original_import
+        _original_import = None
+
+    age = process_age()
+    since_start = f", {age * 1000:.0f} ms since process start" if age is not None else ""
+    print(f"🚀 App ready in {(time.perf_counter() - _began) * 1000:.0f} ms from the start of main's imports{since_start}")
+    if _costs:
+        top = sorted(_costs.items(), key=lambda item: -item[1])[:STARTUP_REPORT_TOP]
+        print("⏱️  Import time by package: " + ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in top))
@@ -0,0 +1,111 @@
+import asyncio
+
+_changes = {}  # key -> asyncio.Event set on the key's next status change
+
+def notify_change(key):
+    """Wake everything waiting in wait_for_change(key)"""
+    event = _changes.pop(key, None)
+    if event is not None:
+        event.set()
+
+async def wait_for_change(key, timeout):
+    """Wait until notify_change(key) runs in this process, or `timeout` seconds.
+
+    Returns False on timeout; callers re-read the store either way, which
+    also catches changes made by another worker process.
+    """
+    event = _changes.setdefault(key, asyncio.Event())
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+class SingleFlight:
+    """Shares one in-flight call among every concurrent caller asking for the same key.
+
+    The call is cancelled once every caller waiting on it has gone away.
+    """
+
+    def __init__(self):
+        self._tasks = {}  # key -> task
+        self._waiters = {}  # key -> callers awaiting the task
+
+    def _finish(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every waiter has gone away
+
+    async def run(self, key, make_call):
+        """Await `make_call()`, or the identical call another caller already started"""
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(make_call())
+            self._tasks[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+
+        # Shield so one caller giving up doesn't cancel the call for the others
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                if not task.done():
+                    # Nobody wants the result any more; stop the call and let
+                    # the next caller start a fresh one
+                    del self._tasks[key]
+                    task.cancel()
+
+class TaskQueue:
+    """Bounded queue drained by a fixed number of asyncio workers.
+
+    `handler(item)` runs once per submitted item and is expected to record
+    its own outcome; exceptions it lets through are logged and dropped.
+    """
+
+    def __init__(self, name, handler, workers, max_size):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.queue = asyncio.Queue(maxsize=max_size)
+        self._tasks = []
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(max(1, self.workers))]
+
+    def submit(self, item):
+        """Queue an item; raises asyncio.QueueFull when the backlog is at its limit"""
+        self.queue.put_nowait(item)
+
+    def depth(self):
+        return self.queue.qsize()
+
+    async def _work(self):
+        while True:
+            item = await self.queue.get()
+            try:
+                await self.handler(item)
+            except Exception as e:
+                print(f"❌ {self.name} task failed: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def stop(self, drain_timeout):
+        """Give queued items up to `drain_timeout` seconds, then stop the workers.
+
+        Returns the items that never started.
+        """
+        try:
+            await asyncio.wait_for(self.queue.join(), drain_timeout)
+        except asyncio.TimeoutError:
+            pass
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        leftover = []
+        while not self.queue.empty():
+            leftover.append(self.queue.get_nowait())
+        return leftover
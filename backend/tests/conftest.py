@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# The modules open their SQLite store at import time; keep it out of the tree
+os.environ.setdefault("SQLITE_DB_FILE", os.path.join(tempfile.mkdtemp(prefix="career_copilot_tests_"), "test.db"))
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
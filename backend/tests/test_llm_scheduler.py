@@ -0,0 +1,142 @@
+import asyncio
+import time
+
+import httpx
+import openai
+import pytest
+
+from services import llm_scheduler
+from services.llm_scheduler import BULK, INTERACTIVE, DeadlineExceeded, LLMOverloaded, LLMScheduler
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def rate_limit_error(retry_after="0"):
+    response = httpx.Response(429, headers={"retry-after": retry_after}, request=httpx.Request("POST", "https://api.test"))
+    return openai.RateLimitError("Rate limit reached", response=response, body=None)
+
+
+def test_calls_within_capacity_go_straight_out():
+    async def scenario():
+        scheduler = LLMScheduler(rpm=60, tpm=100000, max_queue=5)
+        for _ in range(3):
+            await asyncio.wait_for(scheduler.acquire(10), 0.1)
+        assert scheduler.queue_depth() == 0
+    asyncio.run(scenario())
+
+
+def test_full_queue_turns_new_calls_away():
+    async def scenario():
+        scheduler = LLMScheduler(rpm=1, tpm=100000, max_queue=2)
+        await scheduler.acquire(10)  # takes the only request in the bucket
+        waiting = [asyncio.create_task(scheduler.acquire(10)) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert scheduler.queue_depth() == 2
+        with pytest.raises(LLMOverloaded) as overloaded:
+            await scheduler.acquire(10)
+        assert overloaded.value.retry_after >= 1
+        for task in waiting:
+            task.cancel()
+        await asyncio.gather(*waiting, return_exceptions=True)
+        assert scheduler.queue_depth() == 0
+    asyncio.run(scenario())
+
+
+def test_queued_calls_are_released_in_priority_order():
+    async def scenario():
+        scheduler = LLMScheduler(rpm=600, tpm=100000, max_queue=10)  # one request every 0.1s
+        scheduler.requests.tokens = 0
+        released = []
+
+        async def call(name, priority):
+            await scheduler.acquire(10, priority)
+            released.append(name)
+
+        tasks = [asyncio.create_task(call("bulk", BULK))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(call("interactive", INTERACTIVE)))
+        await asyncio.gather(*tasks)
+        assert released == ["interactive", "bulk"]
+    asyncio.run(scenario())
+
+
+def test_rate_limited_calls_are_retried(monkeypatch):
+    monkeypatch.setattr(llm_scheduler, "record_llm_call", lambda *args, **kwargs: None)
+    attempts = []
+
+    async def call():
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            raise rate_limit_error()
+        return "ok"
+
+    scheduler = LLMScheduler(rpm=600, tpm=100000, max_queue=10)
+    assert asyncio.run(scheduler.run(call, MESSAGES, "chat")) == "ok"
+    assert len(attempts) == 3
+
+
+def test_retries_give_up_after_the_limit(monkeypatch):
+    monkeypatch.setattr(llm_scheduler, "record_llm_call", lambda *args, **kwargs: None)
+    monkeypatch.setattr(llm_scheduler, "LLM_MAX_RETRIES", 2)
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        raise rate_limit_error()
+
+    scheduler = LLMScheduler(rpm=600, tpm=100000, max_queue=10)
+    with pytest.raises(openai.RateLimitError):
+        asyncio.run(scheduler.run(call, MESSAGES, "chat"))
+    assert len(attempts) == 3
+
+
+def test_other_errors_are_not_retried():
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        raise ValueError("bad reply")
+
+    scheduler = LLMScheduler(rpm=600, tpm=100000, max_queue=10)
+    with pytest.raises(ValueError):
+        asyncio.run(scheduler.run(call, MESSAGES, "chat"))
+    assert len(attempts) == 1
+
+
+def test_retry_after_header_is_honoured():
+    assert llm_scheduler.retry_delay(0, rate_limit_error("1.5")) == 1.5
+
+
+def test_retry_past_the_deadline_raises_instead_of_sleeping(monkeypatch):
+    monkeypatch.setattr(llm_scheduler, "record_llm_call", lambda *args, **kwargs: None)
+
+    async def call():
+        raise rate_limit_error("5")
+
+    scheduler = LLMScheduler(rpm=600, tpm=100000, max_queue=10)
+    start = time.monotonic()
+    with pytest.raises(openai.RateLimitError):
+        asyncio.run(scheduler.run(call, MESSAGES, "chat", deadline=time.monotonic() + 1))
+    assert time.monotonic() - start < 1
+
+
+def test_waiting_past_the_deadline_raises_deadline_exceeded():
+    async def scenario():
+        scheduler = LLMScheduler(rpm=1, tpm=100000, max_queue=10)
+        await scheduler.acquire(10)
+
+        async def call():
+            return "never"
+
+        with pytest.raises(DeadlineExceeded):
+            await scheduler.run(call, MESSAGES, "chat", deadline=time.monotonic() + 0.05)
+        assert scheduler.queue_depth() == 0
+    asyncio.run(scenario())
+
+
+def test_settle_and_refund_correct_the_token_bucket():
+    scheduler = LLMScheduler(rpm=600, tpm=10000, max_queue=10)
+    scheduler.tokens.take(1000)
+    scheduler.settle(1000, type("Usage", (), {"total_tokens": 400})())
+    scheduler.refund(300)
+    assert scheduler.tokens.tokens == pytest.approx(10000 - 1000 + 600 + 300, abs=5)
@@ -0,0 +1,119 @@
+import asyncio
+
+from services.llm_service import hedged
+from services.task_queue import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    async def scenario():
+        flight, calls = SingleFlight(), []
+
+        async def call():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "reply"
+
+        results = await asyncio.gather(*(flight.run("key", call) for _ in range(5)))
+        assert results == ["reply"] * 5 and len(calls) == 1
+    asyncio.run(scenario())
+
+
+def test_one_caller_leaving_does_not_cancel_the_call_for_the_others():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def call():
+            await asyncio.sleep(0.05)
+            return "reply"
+
+        leaving = asyncio.create_task(flight.run("key", call))
+        staying = asyncio.create_task(flight.run("key", call))
+        await asyncio.sleep(0.01)
+        leaving.cancel()
+        assert await staying == "reply"
+    asyncio.run(scenario())
+
+
+def test_call_is_cancelled_when_every_caller_has_left():
+    async def scenario():
+        flight, cancelled = SingleFlight(), []
+
+        async def call():
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+
+        waiters = [asyncio.create_task(flight.run("key", call)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert cancelled == [1]
+
+        async def fresh():
+            return "fresh"
+
+        assert await flight.run("key", fresh) == "fresh"
+    asyncio.run(scenario())
+
+
+def test_hedge_returns_a_success_that_finished_alongside_a_failure():
+    async def scenario():
+        release = asyncio.Event()
+        attempts = []
+
+        async def attempt():
+            number = len(attempts)
+            attempts.append(number)
+            await release.wait()
+            if number == 1:
+                raise RuntimeError("hedge failed")
+            return "ok"
+
+        async def release_both():
+            await asyncio.sleep(0.05)
+            release.set()
+
+        asyncio.create_task(release_both())
+        assert await hedged(attempt, 0.01, lambda: True) == "ok"
+        assert attempts == [0, 1]
+    for _ in range(10):
+        asyncio.run(scenario())
+
+
+def test_hedge_raises_when_every_attempt_fails():
+    async def scenario():
+        async def attempt():
+            await asyncio.sleep(0.02)
+            raise RuntimeError("down")
+
+        try:
+            await hedged(attempt, 0.01, lambda: True)
+        except RuntimeError:
+            return
+        raise AssertionError("hedged should raise")
+    asyncio.run(scenario())
+
+
+def test_slow_attempt_is_hedged_and_the_loser_cancelled():
+    async def scenario():
+        cancelled = []
+        attempts = []
+
+        async def attempt():
+            number = len(attempts)
+            attempts.append(number)
+            try:
+                await asyncio.sleep(1 if number == 0 else 0.01)
+            except asyncio.CancelledError:
+                cancelled.append(number)
+                raise
+            return number
+
+        assert await hedged(attempt, 0.01, lambda: True) == 1
+        await asyncio.sleep(0)
+        assert cancelled == [0]
+    asyncio.run(scenario())
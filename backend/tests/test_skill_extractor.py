@@ -0,0 +1,36 @@
+import pytest
+
+from services.skill_extractor import PhraseMatcher, skill_matcher
+
+
+def test_matcher_prefers_the_leftmost_longest_phrase():
+    matcher = PhraseMatcher({"Magna Cum Laude": ["Magna Cum Laude"], "Cum Laude": ["Cum Laude"]})
+    assert matcher.find("Graduated Magna Cum Laude, then cum laude again") == ["Magna Cum Laude", "Cum Laude"]
+
+
+def test_matcher_only_matches_whole_words():
+    matcher = PhraseMatcher({"SQL": ["SQL"], "Java": ["Java"]})
+    assert matcher.find("NoSQL stores and JavaScript") == []
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Build experience with Spark pipelines and Airflow", ["Spark", "Airflow"]),
+    ("We write services in Go and Rust.", ["Go", "Rust"]),
+    ("Spark or Flink experience required", ["Spark"]),
+    ("Skills: Python, R, SQL", ["Python", "R", "SQL"]),
+    ("- Spark\n- Go", ["Spark", "Go"]),
+    ("strong leadership and mentoring", ["Leadership", "Mentoring"]),
+])
+def test_ambiguous_skills_are_found_where_they_mean_the_skill(text, expected):
+    assert skill_matcher.find(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "Go to market strategy owner",
+    "Excel at communicating with peers",
+    "spark joy in customers",
+    "R&D budget and Vitamin C research",
+    "present insights to leadership",
+])
+def test_ambiguous_skills_are_ignored_in_everyday_use(text):
+    assert skill_matcher.find(text) == []
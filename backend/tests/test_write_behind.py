@@ -0,0 +1,126 @@
+import time
+
+import pytest
+
+import database
+from database import SqliteStorage, WriteBehind
+from services import chat_memory
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """database with its own SQLite file and a writer that only writes when flushed"""
+    storage = SqliteStorage(str(tmp_path / "history.db"))
+    writer = WriteBehind(storage, batch_size=1000, interval=3600)
+    monkeypatch.setattr(database, "storage", storage)
+    monkeypatch.setattr(database, "writer", writer)
+    monkeypatch.setattr(database, "WRITE_BEHIND", True)
+    monkeypatch.setattr(chat_memory, "_buffers", type(chat_memory._buffers)())
+    monkeypatch.setattr(chat_memory, "_summaries", type(chat_memory._summaries)())
+    yield database
+    writer.close()
+
+
+def add_jobs(db, first, last, company="Acme", missing=("Docker",)):
+    for i in range(first, last):
+        db.add_analysis("r1", f"Job{i}", company, {"fit_score": i * 10, "missing_skills": list(missing)})
+
+
+def walk_pages(db, limit, between_pages=None):
+    titles, cursor = [], None
+    while True:
+        page, cursor = db.get_analysis_page("r1", limit, cursor)
+        assert len(page) <= limit
+        titles += [record["job_title"] for record in page]
+        if between_pages:
+            between_pages()
+        if cursor is None:
+            return titles
+
+
+def test_reads_merge_queued_records_without_writing_them(db):
+    add_jobs(db, 0, 3)
+    db.writer.flush()
+    add_jobs(db, 3, 6, company="Beta", missing=("Docker", "Kubernetes"))
+
+    assert len(db.get_analysis_history("r1")) == 6
+    stats = db.get_analysis_stats("r1")
+    assert (stats["count"], stats["best_fit"]) == (6, 50)
+    assert db.get_fit_trend("r1")[-1]["count"] == 6
+    assert db.get_top_missing_skills("r1")[:2] == [{"skill": "Docker", "count": 6}, {"skill": "Kubernetes", "count": 3}]
+    assert [(row["company"], row["count"]) for row in db.get_company_stats("r1")] == [("Acme", 3), ("Beta", 3)]
+    # Reading did not write the queue
+    assert len(db.writer.pending("analysis", "resume_id", "r1")) == 3
+
+
+def test_reads_do_not_count_a_record_twice_once_written(db):
+    add_jobs(db, 0, 4)
+    db.writer.flush()
+    assert db.writer.pending("analysis", "resume_id", "r1") == []
+    assert len(db.get_analysis_history("r1")) == 4
+    assert db.get_analysis_stats("r1")["count"] == 4
+
+
+@pytest.mark.parametrize("limit", [1, 3, 7, 8, 20])
+def test_pages_respect_limit_and_reach_every_record(db, limit):
+    add_jobs(db, 0, 5)
+    db.writer.flush()
+    add_jobs(db, 5, 12)  # 7 queued ahead of 5 stored
+
+    first, cursor = db.get_analysis_page("r1", 3)
+    assert [record["job_title"] for record in first] == ["Job11", "Job10", "Job9"]
+    assert cursor is not None
+    assert walk_pages(db, limit) == [f"Job{i}" for i in reversed(range(12))]
+
+
+def test_paging_survives_the_queue_being_written_between_pages(db):
+    add_jobs(db, 0, 5)
+    db.writer.flush()
+    add_jobs(db, 5, 12)
+    assert walk_pages(db, 3, between_pages=db.writer.flush) == [f"Job{i}" for i in reversed(range(12))]
+
+
+def test_chat_history_merges_queued_messages(db):
+    for i in range(5):
+        db.add_chat_message(f"q{i}", f"a{i}", "s1")
+    db.add_chat_message("other", "x", "s2")
+    assert [c["user_message"] for c in db.get_chat_history(3, "s1")] == ["q2", "q3", "q4"]
+    db.writer.flush()
+    assert [c["user_message"] for c in db.get_chat_history(3, "s1")] == ["q2", "q3", "q4"]
+
+
+def test_writer_writes_a_lone_record_after_its_interval(tmp_path):
+    writer = WriteBehind(SqliteStorage(str(tmp_path / "lone.db")), batch_size=50, interval=0.05)
+    try:
+        record = writer.add("chat", {"user_message": "hi", "ai_response": "hello", "timestamp": "t", "session_id": "s"})
+        writer.flush()  # the thread must still wake for records queued after a flush
+        record = writer.add("chat", {"user_message": "again", "ai_response": "hello", "timestamp": "t", "session_id": "s"})
+        deadline = time.monotonic() + 5
+        while "id" not in record and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert "id" in record
+    finally:
+        writer.close()
+
+
+def test_chat_buffer_picks_up_turns_another_worker_stored(db):
+    chat_memory.record_turn("s1", db.add_chat_message("mine", "a", "s1"))
+    assert [t["user_message"] for t in chat_memory.recent_turns("s1")] == ["mine"]
+    db.writer.flush()
+
+    # Another worker sharing the store adds a turn and advances the summary
+    db.storage.add_chat_message({"user_message": "theirs", "ai_response": "b", "timestamp": "t", "session_id": "s1"})
+    db.storage.save_chat_summary("s1", {"summary": "from the other worker", "through_id": 0})
+    chat_memory._summaries["s1"] = {"summary": "", "through_id": 0}
+
+    messages = chat_memory.build_messages("system", "s1", "next")
+    assert "from the other worker" in messages[0]["content"]
+    assert [m["content"] for m in messages[1:-1]] == ["mine", "a", "theirs", "b"]
+
+
+def test_chat_buffer_keeps_own_queued_turns_without_reloading(db):
+    chat_memory.recent_turns("s1")
+    buffer = chat_memory._buffers["s1"]
+    chat_memory.record_turn("s1", db.add_chat_message("queued", "a", "s1"))
+    assert [t["user_message"] for t in chat_memory.recent_turns("s1")] == ["queued"]
+    assert chat_memory._buffers["s1"] is buffer
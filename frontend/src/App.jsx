@@ -73,15 +73,19 @@ function App() {
   const [jobSearchResults, setJobSearchResults] = useState([])
   const [searchKeywords, setSearchKeywords] = useState('')
   const [history, setHistory] = useState([])
+  const [historyTotal, setHistoryTotal] = useState(0)
+  const [historyCursor, setHistoryCursor] = useState(null)
   const [chatMessages, setChatMessages] = useState([])
   const [chatInput, setChatInput] = useState('')
+  const [chatSessionId, setChatSessionId] = useState(null)
   const [activeTab, setActiveTab] = useState('upload')
 
-  // Load history when resume is uploaded
+  // Load history when resume is uploaded; a new resume starts a new conversation
   useEffect(() => {
     if (resumeId) {
       loadHistory()
     }
+    setChatSessionId(null)
   }, [resumeId])
 
   // Handle resume upload
@@ -208,12 +212,15 @@ function App() {
     setLoading(false)
   }
 
-  // Load history
-  const loadHistory = async () => {
+  // Load history: the newest page, or the next older page with `more`
+  const loadHistory = async (more = false) => {
     if (!resumeId) return
     try {
-      const response = await axios.get(`${API_URL}/history/${resumeId}`)
-      setHistory(response.data.history)
+      const params = more ? { cursor: historyCursor } : {}
+      const response = await axios.get(`${API_URL}/history/${resumeId}`, { params })
+      setHistory(prev => more ? [...prev, ...response.data.history] : response.data.history)
+      setHistoryTotal(response.data.total)
+      setHistoryCursor(response.data.next_cursor)
     } catch (error) {
       console.error(error)
     }
@@ -231,8 +238,10 @@ function App() {
     try {
       const response = await axios.post(`${API_URL}/chat`, {
         message: userMessage,
-        resume_id: resumeId
+        resume_id: resumeId,
+        session_id: chatSessionId
       })
+      setChatSessionId(response.data.session_id)
       setChatMessages(prev => [...prev, { 
         role: 'assistant', 
         content: response.data.response 
@@ -300,7 +309,7 @@ function App() {
             whileTap={{ scale: 0.95 }}
           >
             <HistoryIcon size={20} />
-            History ({history.length})
+            History ({historyTotal})
           </motion.button>
           <motion.button
             variants={fadeIn}
@@ -885,6 +894,17 @@ function App() {
                     )}
                   </motion.div>
                 ))}
+                {historyCursor !== null && (
+                  <motion.button
+                    className="btn"
+                    onClick={() => loadHistory(true)}
+                    whileHover={{ scale: 1.05 }}
+                    whileTap={{ scale: 0.95 }}
+                  >
+                    <HistoryIcon size={20} />
+                    Load older ({historyTotal - history.length} more)
+                  </motion.button>
+                )}
               </motion.div>
             )}
           </motion.div>